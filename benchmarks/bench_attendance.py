@@ -0,0 +1,205 @@
+"""Offline throughput benchmark for ClassAttendanceWorker.
+
+Serves mock_attendance.html (a local replica of the bgo-class-attendances grid)
+together with a stub backend, drives ClassAttendanceWorker against it in headless
+Chrome and reports students/second, failure rate and per-phase latency.
+
+    python benchmarks/bench_attendance.py --students 40 --engine ui --engine batch
+    python benchmarks/bench_attendance.py --save-latency 300 --refresh-rate 0.02 --json bench.json
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import bgo_auto_tool as bgo
+
+# Stub for the direct API engine, see API_CONFIG in bgo_auto_tool.py. The stub stores any
+# body, so these are the mock's own names and not the real backend's schema
+API_STUB_CONFIG = {
+    'save_path': '/api/class-attendances/{class_id}/students/{student_id}',
+    'method': 'PUT',
+    'fields': {col_id: col_id for col_id in bgo.API_COLUMNS},
+    'student_field': 'student',
+}
+
+
+class MockBackendHandler(SimpleHTTPRequestHandler):
+    """Static mock page plus stub save endpoints with configurable latency"""
+    save_latency = 0.1
+    saved = {}
+    saved_lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=BENCH_DIR, **kwargs)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        # Any class page serves the mock grid, so the URL looks like the real one
+        if urlparse(self.path).path.startswith('/class-attendances/'):
+            self.path = '/mock_attendance.html'
+        super().do_GET()
+
+    def do_POST(self):
+        self.handle_save()
+
+    def do_PUT(self):
+        self.handle_save()
+
+    def handle_save(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+
+        if url.path == '/api/mock-save':
+            latency = float(parse_qs(url.query).get('latency', ['100'])[0]) / 1000
+        elif re.match(r'^/api/class-attendances/[^/]+/students/[^/]+$', url.path):
+            latency = self.save_latency
+            with self.saved_lock:
+                self.saved[url.path] = json.loads(body or b'{}')
+        else:
+            self.send_error(404)
+            return
+
+        time.sleep(latency)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(b'{"ok": true}')
+
+
+def start_server(save_latency):
+    MockBackendHandler.save_latency = save_latency
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockBackendHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_engine(driver, base_url, args, engine, profile):
+    query = urlencode({
+        'rows': args.rows,
+        'renderDelay': args.render_delay,
+        'saveLatency': int(args.save_latency * 1000),
+        'refreshRate': args.refresh_rate,
+    })
+    driver.get(f"{base_url}/class-attendances/bench?{query}")
+    # Start every engine from an unmarked class
+    driver.execute_script("localStorage.clear()")
+    driver.refresh()
+
+    # The mock's own codes, including the ones that overlap longer codes
+    student_ids = driver.execute_script("return students.slice(0, arguments[0])", args.students)
+    # Every third student is marked online
+    online_students = set(student_ids[::3])
+    worker = bgo.ClassAttendanceWorker(
+        student_ids,
+        online_students,
+        args.lesson_type,
+        engine=engine,
+        browser_profile=profile,
+        class_name=f"bench-{engine}",
+        skip_correct=args.skip_correct,
+        timeouts={'row_appear': args.row_timeout},
+        retry_attempts=args.attempts,
+        adaptive=not args.fixed_timeouts,
+        shards=args.shards
+    )
+    worker.driver = driver
+    worker.wait = bgo.WebDriverWait(driver, worker.timeouts['element'])
+
+    start = time.perf_counter()
+    for _ in worker.process_class():
+        pass
+    elapsed = time.perf_counter() - start
+
+    return {
+        'engine': engine,
+        'students': len(student_ids),
+        'seconds': round(elapsed, 3),
+        'students_per_second': round(len(student_ids) / elapsed, 2) if elapsed else None,
+        'failed': len(worker.failed_students),
+        'failure_rate': round(len(worker.failed_students) / len(student_ids), 4),
+        'skipped': len(worker.skipped_students),
+        'recovered': len(worker.recovered_students),
+        'save_statuses': worker.save_statuses(),
+        'phases': worker.timings.summary(),
+        'timeouts': worker.latency.snapshot(worker.timeouts) if worker.latency else worker.timeouts,
+        'errors': sorted({error for _, error in worker.failed_students}),
+    }
+
+
+def print_result(result):
+    print(f"\n=== engine: {result['engine']} ===")
+    print(f"{result['students']} students in {result['seconds']:.2f}s "
+          f"({result['students_per_second']} students/s), "
+          f"{result['failed']} failed ({result['failure_rate']:.1%}), {result['skipped']} skipped, "
+          f"{result['recovered']} recovered by retries")
+    print(f"{'phase':<22}{'count':>7}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}")
+    for row in result['phases']:
+        print(f"{row['phase']:<22}{row['count']:>7}{row['p50'] * 1000:>9.0f}"
+              f"{row['p95'] * 1000:>9.0f}{row['max'] * 1000:>9.0f}")
+    if result['save_statuses']:
+        print("save requests: " + ", ".join(f"{status} x{count}" for status, count in sorted(result['save_statuses'].items())))
+    print("timeouts: " + ", ".join(f"{key} {value}s" for key, value in result['timeouts'].items()))
+    for error in result['errors']:
+        print(f"  error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=60, help="students in the mock class")
+    parser.add_argument('--students', type=int, default=40, help="students to mark")
+    parser.add_argument('--render-delay', type=int, default=50, help="grid re-render delay in ms")
+    parser.add_argument('--save-latency', type=float, default=0.1, help="backend save latency in seconds")
+    parser.add_argument('--refresh-rate', type=float, default=0.0, help="probability of a page reload after each save")
+    parser.add_argument('--row-timeout', type=float, default=bgo.DEFAULT_TIMEOUTS['row_appear'],
+                        help="seconds to wait for a filtered row")
+    parser.add_argument('--lesson-type', choices=['theory', 'practice', 'review'], default='theory')
+    parser.add_argument('--engine', action='append', choices=list(bgo.ATTENDANCE_ENGINES),
+                        help="engine to run, repeat for several (default: all)")
+    parser.add_argument('--attempts', type=int, default=bgo.DEFAULT_RETRY_ATTEMPTS,
+                        help="attempts per student, 1 disables the retry queue")
+    parser.add_argument('--shards', type=int, default=1,
+                        help="browsers sharing the class page, each marking a slice of the students")
+    parser.add_argument('--fixed-timeouts', action='store_true',
+                        help="use the configured timeouts instead of adapting them to observed latency")
+    parser.add_argument('--skip-correct', action='store_true', help="enable diff mode")
+    parser.add_argument('--visible', action='store_true', help="show the browser instead of running headless")
+    parser.add_argument('--json', help="write the results to this file")
+    args = parser.parse_args()
+    args.students = min(args.students, args.rows)
+
+    server = start_server(args.save_latency)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    bgo.API_CONFIG.update(API_STUB_CONFIG, base_url=base_url)
+
+    profile = 'default' if args.visible else 'lean'
+    bgo.load_selenium()
+    driver = bgo.webdriver.Chrome(options=bgo.build_chrome_options(profile))
+    results = []
+    try:
+        for engine in args.engine or list(bgo.ATTENDANCE_ENGINES):
+            result = run_engine(driver, base_url, args, engine, profile)
+            print_result(result)
+            results.append(result)
+    finally:
+        driver.quit()
+        server.shutdown()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as output:
+            json.dump(results, output, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
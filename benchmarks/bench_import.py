@@ -0,0 +1,55 @@
+"""Cold-start benchmark: import time of bgo_auto_tool.
+
+Runs `python -X importtime` in a fresh interpreter and reports the cumulative
+import time of bgo_auto_tool next to selenium.webdriver, which is now loaded
+in the background after the window is shown.
+
+    python benchmarks/bench_import.py --runs 5 --top 10
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$')
+
+
+def import_times(module):
+    """Return {module: (self_us, cumulative_us)} for one cold import"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            times[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help="fresh interpreters per module")
+    parser.add_argument('--top', type=int, default=10, help="heaviest imports to list")
+    args = parser.parse_args()
+
+    for module in ('bgo_auto_tool', 'selenium.webdriver'):
+        runs = [import_times(module) for _ in range(args.runs)]
+        totals = [times[module][1] / 1000 for times in runs if module in times]
+        if not totals:
+            print(f"{module}: not importable here")
+            continue
+        print(f"\n=== {module}: median {statistics.median(totals):.1f} ms, "
+              f"min {min(totals):.1f} ms over {len(totals)} runs ===")
+        heaviest = sorted(runs[-1].items(), key=lambda item: item[1][1], reverse=True)
+        for name, (self_us, cumulative_us) in heaviest[:args.top]:
+            print(f"{name:<40}{self_us / 1000:>9.1f}{cumulative_us / 1000:>9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
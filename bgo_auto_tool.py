@@ -1,54 +1,1146 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait, Select
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
+import os
+import sys
 import time
 import threading
+import queue
+import collections
 import logging
+import logging.handlers
+import atexit
+import json
+import csv
+import math
 import re
-from concurrent.futures import ThreadPoolExecutor
-from PIL import Image, ImageTk
-import requests
-from io import BytesIO
+import signal
+import argparse
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, CancelledError, as_completed
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('bgo_auto.log'),
-        logging.StreamHandler()
-    ]
+# Selenium takes a noticeable share of start-up, so it is imported by load_selenium()
+# on first use, or in the background once the window is shown
+webdriver = None
+By = WebDriverWait = EC = Options = None
+TimeoutException = NoSuchElementException = StaleElementReferenceException = WebDriverException = None
+_selenium_lock = threading.Lock()
+
+def load_selenium():
+    """Import Selenium into the module namespace, safe to call from any thread"""
+    global webdriver, By, WebDriverWait, EC, Options
+    global TimeoutException, NoSuchElementException, StaleElementReferenceException, WebDriverException
+    if webdriver is not None:
+        return
+    with _selenium_lock:
+        if webdriver is not None:
+            return
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.chrome.options import Options
+        from selenium.common.exceptions import (
+            TimeoutException, NoSuchElementException, StaleElementReferenceException, WebDriverException
+        )
+        # Bound last, callers check it to know everything above is available
+        from selenium import webdriver as selenium_webdriver
+        webdriver = selenium_webdriver
+
+BGO_URL = 'http://quanly.bgo.edu.vn/'
+
+# Browser launch profiles: 'default' is a visible maximized window, 'lean' runs
+# headless without images, fonts or extensions for unattended runs
+BROWSER_PROFILES = {
+    'default': "Hiển thị",
+    'lean': "Chạy ẩn (tiết kiệm)",
+}
+DEFAULT_BROWSER_PROFILE = 'default'
+LEAN_WINDOW_SIZE = (1280, 900)
+
+# Persisted Chrome user-data dirs so the login survives restarts. Each concurrently
+# running browser needs its own dir, see profile_dir().
+CHROME_PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chrome_profiles')
+
+# Browsers pre-launched at start-up and leased to workers without an open tab browser
+# (0 disables the pool). A pooled browser is restarted after DRIVER_MAX_USES classes.
+DRIVER_POOL_SIZE = 2
+DRIVER_MAX_USES = 20
+DRIVER_LAUNCH_ATTEMPTS = 5    # starts tried per pool slot before giving up on it
+DRIVER_LAUNCH_BACKOFF = 2.0   # seconds before the second start, doubled for each later one
+
+# Append-only record of students already marked, used by "Tiếp tục điểm danh"
+JOURNAL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bgo_journal.jsonl')
+
+# Saved class profiles (roster, online list, lesson type) and the last open tabs
+PROFILES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bgo_profiles.json')
+
+# Default number of classes processed at the same time by "Điểm danh tất cả"
+DEFAULT_MAX_CONCURRENT_CLASSES = 3
+
+# Wait timeouts in seconds, override per worker with the timeouts argument
+DEFAULT_TIMEOUTS = {
+    'element': 20,         # generic element presence (search box, grid cells)
+    'row_appear': 0.5,     # filtered student row showing up in the grid
+    'select_commit': 2,    # selected option reflected by the cell's select
+    'network_idle': 5,     # pending XHR/fetch save requests finishing
+    'page_ready': 10,      # document.readyState after a refresh
+}
+
+# Waits tuned from observed latency: a high percentile of the recent samples times a
+# safety factor, clamped to (floor, ceiling) seconds. DEFAULT_TIMEOUTS apply until
+# enough samples have been seen.
+ADAPTIVE_TIMEOUT_BOUNDS = {
+    'row_appear': (0.5, 5),   # never below the former fixed 0.5 s, fast samples only keep it there
+    'select_commit': (0.5, 5),
+    'network_idle': (1, 15),
+}
+ADAPTIVE_WINDOW = 50
+ADAPTIVE_PERCENTILE = 95
+ADAPTIVE_SAFETY = 2.0
+ADAPTIVE_MIN_SAMPLES = 5
+
+# Scoped CSS selectors for the class-attendances page, one set per page version.
+# Entries may take {col_id} / {value} parameters.
+SELECTOR_VERSIONS = {
+    'v1': {
+        # Anchored on the page and grid components, the first input of the grid is its search box
+        'search_input': "bgo-class-attendances bgo-grid input",
+        'data_row': "div[role='row'].ag-row:not(.ag-row-header)",
+        'cell': "div[col-id='{col_id}']",
+        'data_cell': "div[role='row'].ag-row:not(.ag-row-header) div[col-id='{col_id}']",
+        'select': "select",
+        'option': "select option[value='{value}']",
+        'no_rows': ".ag-overlay-no-rows, .ag-overlay-no-rows-wrapper",
+        'grid_viewport': ".ag-body-viewport",
+    },
+}
+DEFAULT_SELECTOR_VERSION = 'v1'
+
+# Attendance engines: 'ui' clicks through each student, 'batch' runs one in-page script per chunk
+ATTENDANCE_ENGINES = {
+    'ui': "Từng học sinh",
+    'batch': "Hàng loạt (JavaScript)",
+    'api': "Gọi API trực tiếp",
+}
+DEFAULT_ENGINE = 'ui'
+
+# Where class workers run: threads of the GUI process, or one OS process per worker slot
+JOB_BACKENDS = {
+    'thread': 'Luồng (cùng tiến trình)',
+    'process': 'Tiến trình riêng',
+}
+DEFAULT_JOB_BACKEND = 'thread'
+PROCESS_START_METHOD = 'spawn'  # same behaviour on Windows and Linux, no forked Tk or logging threads
+PROCESS_MAX_RESPAWNS = 2        # restarts of a crashed worker process for the same class
+
+# Failed students are retried at the end of the class: attempts per student in total,
+# and the pause before the first retry round, doubled for every further round
+DEFAULT_RETRY_ATTEMPTS = 3
+RETRY_BACKOFF = 1.0
+
+# Errors that no retry can fix, matched by prefix
+STUDENT_NOT_IN_CLASS = "Học sinh không có trong lớp"
+NO_OPTION_ERROR = "Không có lựa chọn"  # the cell has no option for the value, e.g. a changed page
+PERMANENT_ERRORS = (STUDENT_NOT_IN_CLASS, NO_OPTION_ERROR)
+
+# Error types of the report, the first whose patterns occur in the message (case-insensitive) wins
+ERROR_TYPES = (
+    ("Không có trong lớp", (STUDENT_NOT_IN_CLASS,)),
+    ("Sai lựa chọn", (NO_OPTION_ERROR,)),
+    ("Lưu thất bại", ("Lưu ô", "yêu cầu lưu", "API trả về lỗi")),
+    ("Quá thời gian", ("Quá thời gian", "timeout", "timed out")),
+    ("Không tìm thấy", ("Không tìm thấy",)),
+    ("Trình duyệt", ("trình duyệt", "Tiến trình xử lý", "Message:")),
 )
+OTHER_ERROR_TYPE = "Khác"
+REPORT_COLUMNS = {
+    'run': ("Lần", 45),
+    'time': ("Giờ", 70),
+    'class': ("Lớp", 140),
+    'student_id': ("Mã HS", 80),
+    'error_type': ("Loại lỗi", 120),
+    'error': ("Chi tiết", 420),
+}
+REPORT_INSERT_BATCH = 500  # table rows inserted per Tk idle slice when redrawing
+
+# Lesson types as used by the class tabs and class definition files
+LESSON_TYPES = {
+    'theory': "Lý thuyết",
+    'practice': "Luyện đề",
+    'review': "Chữa đề",
+}
+
+# Accepted header names for roster files (CSV/XLSX), matched case-insensitively
+ROSTER_COLUMNS = {
+    'class': ('class', 'lớp', 'lop', 'tên lớp', 'ten lop'),
+    'student_id': ('student_id', 'id', 'mã học sinh', 'ma hoc sinh', 'mã hs', 'mahs'),
+    'online': ('online', 'học online', 'hoc online'),
+    'lesson_type': ('lesson_type', 'loại tiết học', 'loai tiet hoc'),
+    'url': ('url', 'link'),
+}
+
+# Number of students sent to the page per script call in batch mode
+BATCH_SIZE = 25
+
+# Browsers sharing one class page, each marking its own slice of the roster
+DEFAULT_SHARDS = 1
+MAX_SHARDS = 6
+SHARD_MIN_STUDENTS = 10  # smaller slices are not worth another browser start
+
+# Shared in-page helpers for locating a student's row in the ag-grid.
+# Scripts using them define `selectors` (the registry's selector strings) first.
+GRID_HELPERS_JS = """
+// Data rows grouped by ag-grid row index (pinned columns split a row into several elements)
+function rowGroups() {
+    var groups = {}, order = [];
+    document.querySelectorAll(selectors.data_row).forEach(function(row) {
+        var key = row.getAttribute('row-index') || String(order.length);
+        if (!groups[key]) { groups[key] = []; order.push(key); }
+        groups[key].push(row);
+    });
+    order.sort(function(a, b) { return Number(a) - Number(b); });
+    return order.map(function(key) { return groups[key]; });
+}
+
+function groupText(group) {
+    return group.map(function(row) { return row.textContent; }).join(' ');
+}
+
+function findStudentRow(id) {
+    var groups = rowGroups();
+    if (!groups.length) return null;
+    // Wait until the filter has been applied to every visible row
+    if (!groups.every(function(group) { return groupText(group).indexOf(id) !== -1; })) return null;
+    // Only a cell exactly equal to the ID counts: 10 must not match the previous student's 101
+    var exact = groups.find(function(group) {
+        return group.some(function(row) {
+            return Array.prototype.some.call(row.querySelectorAll("[col-id]"), function(cell) {
+                return cell.textContent.trim() === id;
+            });
+        });
+    });
+    return exact || null;
+}
+
+function cellSelect(group, colId) {
+    for (var i = 0; i < group.length; i++) {
+        var select = group[i].querySelector(selectors.cell.replace('{col_id}', colId) + ' ' + selectors.select);
+        if (select) return select;
+    }
+    return null;
+}
+"""
+
+# Polling helpers for the async scripts
+ASYNC_HELPERS_JS = """
+function sleep(ms) { return new Promise(function(resolve) { setTimeout(resolve, ms); }); }
+
+async function waitFor(check, timeoutMs) {
+    var deadline = Date.now() + timeoutMs;
+    while (true) {
+        var value = check();
+        if (value) return value;
+        if (Date.now() >= deadline) return null;
+        await sleep(20);
+    }
+}
+"""
+
+# Selects of a student's filtered row, called with (student_id, col_ids, selectors).
+# Returns {values: {col_id: value}, selects: {col_id: element}} or null while the
+# filter has not produced the student's row yet.
+READ_ROW_VALUES_JS = """
+var studentId = arguments[0], colIds = arguments[1], selectors = arguments[2];
+""" + GRID_HELPERS_JS + """
+var group = findStudentRow(studentId);
+if (!group) return null;
+var values = {}, selects = {};
+colIds.forEach(function(colId) {
+    var select = cellSelect(group, colId);
+    values[colId] = select ? select.value : null;
+    selects[colId] = select;
+});
+return {values: values, selects: selects};
+"""
+
+# In-page batch attendance, called with ([[student_id, [[col_id, value], ...]], ...], options, callback).
+# Pairs rather than objects keep students and columns in order (JS sorts numeric keys).
+# Calls back with {results: {student_id: null on success or an error message},
+# skipped: [student_ids whose row was already correct]}.
+BATCH_ATTENDANCE_JS = """
+var students = arguments[0], opts = arguments[1];
+var callback = arguments[arguments.length - 1];
+var selectors = opts.selectors;
+""" + GRID_HELPERS_JS + ASYNC_HELPERS_JS + """
+// The row is looked up on every read: a save re-renders it and detaches the old selects
+function studentSelect(id, colId) {
+    var group = findStudentRow(id);
+    return group ? cellSelect(group, colId) : null;
+}
+
+// Returns false when the cell already had the value and nothing was written
+async function setCell(id, colId, value) {
+    var select = await waitFor(function() { return studentSelect(id, colId); }, opts.elementMs);
+    if (!select) throw new Error('Không tìm thấy ô ' + colId);
+    if (opts.skipCorrect && select.value === value) return false;
+    if (!select.querySelector("option[value='" + value + "']")) throw new Error('Không có lựa chọn ' + value + ' ở ô ' + colId);
+    select.value = value;
+    select.dispatchEvent(new Event('change', {bubbles: true}));
+    var committed = await waitFor(function() {
+        var current = studentSelect(id, colId);
+        return current && current.value === value;
+    }, opts.commitMs);
+    if (!committed) throw new Error('Quá thời gian chờ ô ' + colId + ' nhận giá trị ' + value);
+    if (!(await waitFor(function() { return !window.__bgoPendingRequests; }, opts.idleMs))) {
+        throw new Error('Quá thời gian chờ mạng sau khi chọn ô ' + colId);
+    }
+    // A rejected save re-renders the row with the old value
+    var current = studentSelect(id, colId);
+    if (current && current.value !== value) throw new Error('Lưu ô ' + colId + ' thất bại');
+    return true;
+}
+
+async function run() {
+    var results = {}, skipped = [];
+    for (var i = 0; i < students.length; i++) {
+        var id = students[i][0], cells = students[i][1];
+        try {
+            var input = document.querySelector(selectors.search_input);
+            if (!input) throw new Error('Không tìm thấy ô tìm kiếm');
+            input.value = id;
+            input.dispatchEvent(new Event('input', {bubbles: true}));
+            var group = await waitFor(function() { return findStudentRow(id); }, opts.rowMs);
+            if (!group) {
+                // The grid's no-rows overlay means the filter matched nobody, not a slow render
+                throw new Error(document.querySelector(selectors.no_rows) ? opts.notInClass : 'Không tìm thấy học sinh trong danh sách');
+            }
+            var written = false;
+            for (var j = 0; j < cells.length; j++) {
+                written = (await setCell(id, cells[j][0], cells[j][1])) || written;
+            }
+            if (!written) skipped.push(id);
+            results[id] = null;
+        } catch (e) {
+            results[id] = e.message || String(e);
+        }
+    }
+    return {results: results, skipped: skipped};
+}
+
+run().then(callback, function(e) { callback({__error__: String(e)}); });
+"""
+
+# Current values of the whole unfiltered grid in one pass, called with (student_ids, col_ids, options, callback).
+# Clears the filter, reads the rendered rows and scrolls the grid body to render the rest.
+# Calls back with {values: {student_id: {col_id: value}}} for the students it saw.
+READ_GRID_VALUES_JS = """
+var studentIds = arguments[0], colIds = arguments[1], opts = arguments[2];
+var callback = arguments[arguments.length - 1];
+var selectors = opts.selectors;
+""" + GRID_HELPERS_JS + ASYNC_HELPERS_JS + """
+var wanted = {}, found = {};
+studentIds.forEach(function(id) { wanted[id] = true; });
+
+function readRendered() {
+    rowGroups().forEach(function(group) {
+        var id = null;
+        group.forEach(function(row) {
+            Array.prototype.forEach.call(row.querySelectorAll("[col-id]"), function(cell) {
+                var text = cell.textContent.trim();
+                if (wanted[text]) id = text;
+            });
+        });
+        if (!id) return;
+        var values = {};
+        colIds.forEach(function(colId) {
+            var select = cellSelect(group, colId);
+            values[colId] = select ? select.value : null;
+        });
+        found[id] = values;
+    });
+}
+
+// The grid re-renders after a filter change or a scroll, wait until the row count stops changing
+async function settle() {
+    var last = -1, stable = 0, deadline = Date.now() + opts.settleMs;
+    while (stable < 2 && Date.now() < deadline) {
+        await sleep(50);
+        var count = rowGroups().length;
+        stable = count === last ? stable + 1 : 0;
+        last = count;
+    }
+}
+
+async function run() {
+    var input = document.querySelector(selectors.search_input);
+    if (input && input.value) {
+        input.value = '';
+        input.dispatchEvent(new Event('input', {bubbles: true}));
+    }
+    await settle();
+    readRendered();
+    var viewport = document.querySelector(selectors.grid_viewport);
+    while (viewport && viewport.scrollTop + viewport.clientHeight < viewport.scrollHeight) {
+        var before = viewport.scrollTop;
+        viewport.scrollTop = before + viewport.clientHeight;
+        if (viewport.scrollTop === before) break;
+        await settle();
+        readRendered();
+    }
+    if (viewport) viewport.scrollTop = 0;
+    return {values: found};
+}
+
+run().then(callback, function(e) { callback({__error__: String(e)}); });
+"""
+
+# Direct backend access for the 'api' engine. The backend's save request is not documented,
+# so everything below the base URL is empty until copied from the request the
+# class-attendances page sends in the browser's network tab. Until then the engine is
+# hidden in the GUI and refused by the CLI. save_path may use {class_id} and {student_id}.
+API_COLUMNS = ('arrivalStatus', '4', '10')  # grid columns the tool writes
+API_CONFIG = {
+    'base_url': BGO_URL,
+    'save_path': '',
+    'method': '',
+    # Request body field for each of API_COLUMNS
+    'fields': {},
+    'student_field': '',
+    # localStorage keys that may hold the bearer token, first match wins
+    'token_keys': ['access_token', 'token', 'id_token'],
+    'pool_size': 10,
+}
+
+# Configure logging
+# JSON lines log, rotated by size
+LOG_FILE = 'bgo_auto.log'
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+
+# Structured fields passed through log_event(), written under these JSON keys
+LOG_FIELDS = {
+    'class_name': 'class',
+    'student': 'student',
+    'phase': 'phase',
+    'duration': 'duration',
+    'outcome': 'outcome',
+}
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line with the structured fields of log_event()"""
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        if record.processName != 'MainProcess':
+            entry['process'] = record.processName
+        for attribute, key in LOG_FIELDS.items():
+            value = getattr(record, attribute, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+def setup_logging(path=LOG_FILE):
+    """Send log records through a queue so Selenium and Tk threads never wait on file or console I/O"""
+    file_handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+    )
+    file_handler.setFormatter(JsonLogFormatter())
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    listener.start()
+    # Flush what is still queued when the interpreter exits
+    atexit.register(listener.stop)
+    return listener
+
+def log_event(message, level=logging.INFO, **fields):
+    """Log with structured fields: class_name, student, phase, duration, outcome"""
+    logging.log(level, message, extra={key: value for key, value in fields.items() if value is not None})
+
+LOG_LISTENER = setup_logging()
+
+def profile_dir(name):
+    """Persisted user-data dir for one browser slot, e.g. profile_dir('tab_1')"""
+    return os.path.join(CHROME_PROFILE_DIR, name)
+
+def build_chrome_options(profile=DEFAULT_BROWSER_PROFILE, user_data_dir=None):
+    load_selenium()
+    chrome_options = Options()
+    chrome_options.add_argument('--log-level=3')
+    if user_data_dir:
+        chrome_options.add_argument(f'--user-data-dir={user_data_dir}')
+    # DevTools network events in the performance log, used by SaveTracker to confirm saves
+    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    chrome_options.add_experimental_option('perfLoggingPrefs', {'enableNetwork': True, 'enablePage': False})
+    
+    if profile == 'lean':
+        width, height = LEAN_WINDOW_SIZE
+        chrome_options.add_argument('--headless=new')
+        chrome_options.add_argument(f'--window-size={width},{height}')
+        chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+        chrome_options.add_argument('--disable-remote-fonts')
+        chrome_options.add_argument('--disable-extensions')
+        chrome_options.add_argument('--disable-gpu')
+        chrome_options.add_argument('--mute-audio')
+        chrome_options.add_argument('--no-first-run')
+        chrome_options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+            'profile.default_content_setting_values.notifications': 2,
+        })
+        # Start working once the DOM is ready instead of waiting for every resource
+        chrome_options.page_load_strategy = 'eager'
+    else:
+        chrome_options.add_argument('--start-maximized')
+    return chrome_options
+
+def start_browser(profile=DEFAULT_BROWSER_PROFILE, user_data_dir=None):
+    """Launch Chrome with the given profile and open the BGO site"""
+    # Pool threads can get here before the background import has finished
+    load_selenium()
+    driver = webdriver.Chrome(options=build_chrome_options(profile, user_data_dir))
+    try:
+        driver.get(BGO_URL)
+        if profile != 'lean':
+            # The lean profile uses a fixed small window instead of zooming out
+            driver.execute_script("document.body.style.zoom='67%'")
+    except Exception:
+        driver.quit()
+        raise
+    return driver
+
+def is_browser_alive(driver):
+    """Health check for a WebDriver session, False if the browser was closed or crashed"""
+    if driver is None:
+        return False
+    try:
+        return driver.execute_script("return 1") == 1
+    except Exception:
+        return False
+
+def clone_session(source, target, url):
+    """Open url in target with the cookies and localStorage of the logged-in source browser"""
+    origin = re.match(r'^(https?://[^/]+)', url).group(1)
+    if not target.current_url.startswith(origin):
+        # Cookies and storage can only be set for the page's own domain
+        target.get(origin + '/')
+    for cookie in source.get_cookies():
+        try:
+            target.add_cookie(cookie)
+        except Exception as e:
+            logging.debug(f"Cookie {cookie.get('name')} not copied: {str(e)}")
+    storage = source.execute_script("return JSON.stringify(Object.assign({}, localStorage));")
+    target.execute_script(
+        "var items = JSON.parse(arguments[0]);"
+        "for (var key in items) { localStorage.setItem(key, items[key]); }",
+        storage
+    )
+    target.get(url)
+
+def error_message(error):
+    """Report text for an exception. Selenium's own text starts with "Message:" whatever
+    went wrong, so its exceptions are described by type instead"""
+    if WebDriverException is None or not isinstance(error, WebDriverException):
+        return str(error)
+    if isinstance(error, TimeoutException):
+        return "Quá thời gian chờ trang phản hồi"
+    if isinstance(error, StaleElementReferenceException):
+        return "Trình duyệt vẽ lại bảng trong lúc chọn"
+    if isinstance(error, NoSuchElementException):
+        return "Không tìm thấy phần tử trên trang"
+    return f"Lỗi trình duyệt: {error.msg or type(error).__name__}"
+
+def is_transient_error(error):
+    """True for failures worth retrying (timeouts, stale elements, refreshes)"""
+    return not str(error).startswith(PERMANENT_ERRORS)
+
+class DriverPool:
+    """Pre-launched browsers leased to workers and recycled after use.
+
+    Each slot keeps its own persisted user-data dir (pool_<n>) so logins survive restarts.
+    """
+    def __init__(self, size=DRIVER_POOL_SIZE, profile=DEFAULT_BROWSER_PROFILE, max_uses=DRIVER_MAX_USES):
+        self.size = size
+        self.profile = profile
+        self.max_uses = max_uses
+        self._idle = queue.Queue()
+        self._slots = {}    # driver -> slot number
+        self._uses = {}     # slot number -> classes run on the current browser
+        self._launching = 0
+        self._lock = threading.Lock()
+        self._started = False
+        self._closed = False
+
+    def start(self):
+        """Launch every slot in the background, once"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for slot in range(self.size):
+            self._launch_async(slot)
+
+    def _launch_async(self, slot, attempt=1):
+        with self._lock:
+            if self._closed:
+                return
+            self._launching += 1
+        threading.Thread(target=self._launch, args=(slot, attempt), daemon=True, name=f'driver-pool-{slot}').start()
+
+    def _launch(self, slot, attempt=1):
+        try:
+            driver = start_browser(self.profile, profile_dir(f"pool_{slot}"))
+            logging.info(f"Pooled browser {slot} ready")
+        except Exception as e:
+            driver = None
+            if attempt < DRIVER_LAUNCH_ATTEMPTS:
+                delay = DRIVER_LAUNCH_BACKOFF * 2 ** (attempt - 1)
+                logging.warning(f"Pooled browser {slot} failed to start, retrying in {delay:.0f}s: {str(e)}")
+                # Not counted as launching while waiting, so lease() does not block on the backoff
+                timer = threading.Timer(delay, self._launch_async, args=(slot, attempt + 1))
+                timer.daemon = True
+                timer.start()
+            else:
+                logging.error(f"Pooled browser {slot} failed to start {attempt} times, slot left empty: {str(e)}")
+        with self._lock:
+            self._launching -= 1
+            if driver is not None and self._closed:
+                closed = True
+            else:
+                closed = False
+                if driver is not None:
+                    self._slots[driver] = slot
+                    self._uses[slot] = 0
+                    self._idle.put(driver)
+        if closed:
+            self._quit(driver)
+
+    def lease(self, timeout=10):
+        """Return a healthy idle browser, or None if the pool has nothing to offer.
+
+        Waits up to timeout seconds only while a browser is still starting.
+        """
+        deadline = time.monotonic() + timeout
+        while not self._closed:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    launching = self._launching
+                remaining = deadline - time.monotonic()
+                if not launching or remaining <= 0:
+                    return None
+                try:
+                    driver = self._idle.get(timeout=min(remaining, 0.5))
+                except queue.Empty:
+                    continue
+            
+            if is_browser_alive(driver):
+                return driver
+            # Crashed or closed while idle, replace it and try the next one
+            logging.warning("Pooled browser is not responding, restarting it")
+            self._replace(driver)
+        return None
+
+    def release(self, driver, broken=False):
+        """Return a leased browser, restarting it if it crashed or reached max_uses"""
+        with self._lock:
+            slot = self._slots.get(driver)
+            if slot is None:
+                return
+            self._uses[slot] += 1
+            worn_out = self._uses[slot] >= self.max_uses
+        
+        if self._closed or broken or worn_out or not is_browser_alive(driver):
+            self._replace(driver)
+            return
+        try:
+            # Leave the class page, the next lease must never mark its roster there
+            driver.get(BGO_URL)
+        except Exception as e:
+            logging.warning(f"Pooled browser could not leave the class page, restarting it: {str(e)}")
+            self._replace(driver)
+            return
+        self._idle.put(driver)
+
+    def _replace(self, driver):
+        with self._lock:
+            slot = self._slots.pop(driver, None)
+        self._quit(driver)
+        if slot is not None:
+            self._launch_async(slot)
+
+    def set_profile(self, profile):
+        """Switch launch profile, restarting idle browsers with it"""
+        if profile == self.profile:
+            return
+        self.profile = profile
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._replace(driver)
+
+    def _quit(self, driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            drivers = list(self._slots)
+            self._slots.clear()
+        for driver in drivers:
+            self._quit(driver)
+
+class TimingRecorder:
+    """Per-student phase timings on a monotonic clock, aggregated into p50/p95/max"""
+    def __init__(self, class_name=None):
+        self.class_name = class_name
+        self.samples = []   # (class_name, student_id, phase, seconds)
+        self._lock = threading.Lock()
+
+    def record(self, phase, seconds, student_id=None):
+        with self._lock:
+            self.samples.append((self.class_name, student_id, phase, seconds))
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            log_event(f"{phase} {seconds * 1000:.0f} ms", logging.DEBUG, class_name=self.class_name,
+                      student=student_id, phase=phase, duration=round(seconds, 4))
+
+    @contextmanager
+    def phase(self, name, student_id=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, student_id)
+
+    def merge(self, other):
+        """Add another recorder's samples, e.g. each class into the run"""
+        with self._lock:
+            self.samples.extend(other.samples)
+
+    @staticmethod
+    def percentile(values, pct):
+        """Nearest-rank percentile of a non-empty list"""
+        ordered = sorted(values)
+        index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def summary(self, by_class=False):
+        """Rows of count/total/p50/p95/max seconds per phase, optionally per class too"""
+        groups = {}
+        for class_name, _, phase, seconds in self.samples:
+            key = (class_name if by_class else None, phase)
+            groups.setdefault(key, []).append(seconds)
+        
+        rows = []
+        for (class_name, phase), values in groups.items():
+            row = {
+                'phase': phase,
+                'count': len(values),
+                'total': round(sum(values), 4),
+                'p50': round(self.percentile(values, 50), 4),
+                'p95': round(self.percentile(values, 95), 4),
+                'max': round(max(values), 4),
+            }
+            if by_class:
+                row['class'] = class_name
+            rows.append(row)
+        # Slowest phases first
+        rows.sort(key=lambda row: (row.get('class') or '', -row['total']))
+        return rows
+
+    def export_json(self, path):
+        data = {
+            'run': self.summary(),
+            'classes': self.summary(by_class=True),
+            'samples': [
+                {'class': class_name, 'student_id': student_id, 'phase': phase, 'seconds': seconds}
+                for class_name, student_id, phase, seconds in self.samples
+            ],
+        }
+        with open(path, 'w', encoding='utf-8') as output:
+            json.dump(data, output, ensure_ascii=False, indent=2)
+
+    def export_csv(self, path):
+        fields = ['class', 'phase', 'count', 'total', 'p50', 'p95', 'max']
+        with open(path, 'w', newline='', encoding='utf-8-sig') as output:
+            writer = csv.DictWriter(output, fieldnames=fields)
+            writer.writeheader()
+            for row in self.summary():
+                writer.writerow(dict(row, **{'class': 'ALL'}))
+            for row in self.summary(by_class=True):
+                writer.writerow(row)
+
+class AdaptiveTimeouts:
+    """Rolling latency samples per wait, turned into timeouts.
+
+    A wait that times out is recorded at its full timeout, so repeated timeouts
+    raise the estimate step by step up to the ceiling. One instance can be shared
+    by the classes of a run.
+    """
+    def __init__(self, bounds=None, window=ADAPTIVE_WINDOW, percentile=ADAPTIVE_PERCENTILE,
+                 safety=ADAPTIVE_SAFETY, min_samples=ADAPTIVE_MIN_SAMPLES):
+        self.bounds = dict(ADAPTIVE_TIMEOUT_BOUNDS, **(bounds or {}))
+        self.percentile = percentile
+        self.safety = safety
+        self.min_samples = min_samples
+        self.samples = {key: collections.deque(maxlen=window) for key in self.bounds}
+        self._lock = threading.Lock()
+
+    def observe(self, key, seconds):
+        if key in self.samples:
+            with self._lock:
+                self.samples[key].append(seconds)
+
+    def timeout(self, key, default):
+        """Current timeout for key, default while there are too few samples"""
+        if key not in self.samples:
+            return default
+        with self._lock:
+            values = list(self.samples[key])
+        if len(values) < self.min_samples:
+            return default
+        floor, ceiling = self.bounds[key]
+        estimate = TimingRecorder.percentile(values, self.percentile) * self.safety
+        return min(ceiling, max(floor, estimate))
+
+    def snapshot(self, defaults=DEFAULT_TIMEOUTS):
+        return {key: round(self.timeout(key, defaults[key]), 3) for key in self.samples}
+
+class AttendanceJournal:
+    """Append-only JSONL checkpoint of students marked successfully.
+
+    Entries are keyed by class name, date, lesson type and student ID so an
+    interrupted run can be resumed without redoing finished students.
+    """
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._done = None
+        self._partial_line = False
+
+    @staticmethod
+    def today():
+        return time.strftime("%Y-%m-%d", time.localtime())
+
+    def _load(self):
+        # Called with the lock held
+        if self._done is not None:
+            return
+        self._done = set()
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as journal_file:
+            for line in journal_file:
+                self._partial_line = not line.endswith("\n")
+                try:
+                    entry = json.loads(line)
+                    self._done.add((entry['class'], entry['date'], entry['lesson_type'], entry['student_id']))
+                except (ValueError, KeyError):
+                    # A crash can leave a partially written last line
+                    continue
+
+    def record(self, class_name, lesson_type, student_id, date=None):
+        entry = {
+            'class': class_name,
+            'date': date or self.today(),
+            'lesson_type': lesson_type,
+            'student_id': student_id,
+            'time': time.strftime("%H:%M:%S", time.localtime()),
+        }
+        with self._lock:
+            self._load()
+            with open(self.path, 'a', encoding='utf-8') as journal_file:
+                if self._partial_line:
+                    # Start a fresh line after a half-written one
+                    journal_file.write("\n")
+                    self._partial_line = False
+                journal_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._done.add((class_name, entry['date'], lesson_type, student_id))
+
+    def reload(self):
+        """Forget the cached entries, e.g. after another process appended to the file"""
+        with self._lock:
+            self._done = None
+            self._partial_line = False
+
+    def remaining(self, class_name, lesson_type, student_ids, date=None):
+        """Students of the list not yet recorded for this class, date and lesson type"""
+        date = date or self.today()
+        with self._lock:
+            self._load()
+            return [student_id for student_id in student_ids
+                    if (class_name, date, lesson_type, student_id) not in self._done]
+
+class ClassProfileStore:
+    """Class profiles keyed by class name in one compact JSON file.
+
+    The whole file is read once and rewritten atomically on flush, so switching
+    between classes is a dict lookup.
+    """
+    def __init__(self, path=PROFILES_FILE):
+        self.path = path
+        self.classes = {}
+        self.session = []   # class names of the tabs open when the app was last closed
+        try:
+            with open(self.path, encoding='utf-8') as store_file:
+                data = json.load(store_file)
+            self.classes = data.get('classes', {})
+            self.session = [name for name in data.get('session', []) if name in self.classes]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            logging.error(f"Could not read class profiles, starting empty: {str(e)}")
+
+    def names(self):
+        return sorted(self.classes)
+
+    def get(self, name):
+        return self.classes.get(name)
+
+    def save(self, name, student_ids, online_students, lesson_type):
+        self.classes[name] = {
+            'student_ids': list(student_ids),
+            'online_students': list(online_students),
+            'lesson_type': lesson_type,
+        }
+
+    def flush(self):
+        data = {'session': self.session, 'classes': self.classes}
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as store_file:
+            json.dump(data, store_file, ensure_ascii=False, separators=(',', ':'))
+        os.replace(temp_path, self.path)
+
+class SaveTracker:
+    """Follow the page's save requests through Chrome's DevTools network events.
+
+    Reads Network.* events from the performance log enabled in build_chrome_options.
+    mark() is called before a change, wait() then returns the XHR/fetch writes the
+    change caused, with status code and latency, once all of them have finished.
+    """
+    SAVE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.requests = {}      # request id -> save request started since mark()
+        self.seen_save = False  # whether the page has ever saved through XHR/fetch
+
+    @classmethod
+    def attach(cls, driver):
+        """A tracker for driver, or None if its performance log is not available"""
+        tracker = cls(driver)
+        try:
+            driver.get_log('performance')
+        except Exception as e:
+            logging.warning(f"DevTools network log unavailable, save confirmation disabled: {str(e)}")
+            return None
+        return tracker
+
+    def mark(self):
+        """Forget earlier traffic, only requests after this call are waited on"""
+        self.poll()
+        self.requests = {}
+
+    def poll(self):
+        for entry in self.driver.get_log('performance'):
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError):
+                continue
+            method, params = message.get('method'), message.get('params', {})
+            if method == 'Network.requestWillBeSent':
+                request = params.get('request', {})
+                if params.get('type') in ('XHR', 'Fetch') and request.get('method') in self.SAVE_METHODS:
+                    self.seen_save = True
+                    self.requests[params['requestId']] = {
+                        'url': request.get('url'),
+                        'method': request.get('method'),
+                        'start': params.get('timestamp'),
+                        'status': None,
+                        'error': None,
+                        'latency': None,
+                        'done': False,
+                    }
+                continue
+            request = self.requests.get(params.get('requestId'))
+            if request is None:
+                continue
+            if method == 'Network.responseReceived':
+                request['status'] = params.get('response', {}).get('status')
+            elif method in ('Network.loadingFinished', 'Network.loadingFailed'):
+                request['done'] = True
+                if method == 'Network.loadingFailed':
+                    request['error'] = params.get('errorText') or "failed"
+                if request['start'] is not None and params.get('timestamp') is not None:
+                    request['latency'] = params['timestamp'] - request['start']
+
+    def wait(self, timeout):
+        """Save requests since mark() once all have finished, [] if none started within timeout.
+
+        Raises TimeoutException while a started request is still in flight at the timeout.
+        """
+        def settled(driver):
+            self.poll()
+            return bool(self.requests) and all(request['done'] for request in self.requests.values())
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=0.05).until(settled)
+        except TimeoutException:
+            if self.requests:
+                raise
+            return []
+        return list(self.requests.values())
+
+class SelectorRegistry:
+    """Scoped CSS selectors for one page version, with resolved elements cached per page"""
+    def __init__(self, version=DEFAULT_SELECTOR_VERSION):
+        self.version = version
+        self.selectors = SELECTOR_VERSIONS[version]
+        self._compiled = {}
+        self._elements = {}
+
+    def css(self, name, **params):
+        """Selector string with its parameters filled in, formatted once per combination"""
+        key = (name, tuple(sorted(params.items())))
+        if key not in self._compiled:
+            self._compiled[key] = self.selectors[name].format(**params)
+        return self._compiled[key]
+
+    def cached(self, name, resolve):
+        """Element resolved by resolve() and kept until invalidate() is called"""
+        element = self._elements.get(name)
+        if element is None:
+            element = self._elements[name] = resolve()
+        return element
+
+    def invalidate(self):
+        """Forget resolved elements, e.g. after a page refresh"""
+        self._elements.clear()
+
+class JobCancelled(Exception):
+    """Raised inside a worker task that was cancelled before it started"""
+
+class JobControl:
+    """Pause, resume and cancel flags shared by the workers of one run.
+
+    Workers call wait_if_paused() between students and between classes, so the
+    student in progress always finishes before a pause or cancel takes effect.
+    Pass a multiprocessing context to share the flags with worker processes.
+    """
+    def __init__(self, context=None):
+        events = context or threading
+        self._running = events.Event()
+        self._running.set()
+        self._cancelled = events.Event()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def pause(self):
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def cancel(self):
+        self._cancelled.set()
+        # Wake paused workers so they can stop
+        self._running.set()
+
+    def wait_if_paused(self):
+        """Block while paused, returns False once the run is cancelled"""
+        while not self._running.wait(0.2):
+            pass
+        return not self._cancelled.is_set()
 
 class ClassAttendanceWorker:
-    def __init__(self, student_ids, online_students, lesson_type):
+    def __init__(self, student_ids, online_students, lesson_type, timeouts=None, engine=DEFAULT_ENGINE,
+                 browser_profile=DEFAULT_BROWSER_PROFILE, user_data_dir=None, driver_pool=None,
+                 selector_version=DEFAULT_SELECTOR_VERSION, journal=None, class_name=None, skip_correct=False,
+                 class_url=None, retry_attempts=DEFAULT_RETRY_ATTEMPTS, latency=None, adaptive=True,
+                 control=None, shards=DEFAULT_SHARDS):
+        load_selenium()
         self.driver = None
         self.wait = None
         self.student_ids = student_ids
         self.online_students = online_students
         self.lesson_type = lesson_type
         self.failed_students = []
+        self.skipped_students = []  # already correct, nothing written
+        self.retry_queue = []       # transient failures waiting for the next retry round
+        self.recovered_students = []  # failed at first, marked on a retry
+        self.retry_attempts = retry_attempts
+        self.save_tracker = None    # SaveTracker once the browser is ready, None falls back to network idle
+        self.save_results = []      # one entry per confirmed save request
+        self.durations = {}         # student ID -> seconds of its last attempt, for the outcome log
+        self.settled = set()        # students marked, skipped or reported failed
+        self.control = control      # JobControl of the run, None when it cannot be paused
+        self.cancelled = False
+        self.skip_correct = skip_correct
+        self.grid_values = None     # values read in one pass over the grid for skip_correct, by student ID
+        self.timeouts = dict(DEFAULT_TIMEOUTS, **(timeouts or {}))
+        # Waits follow observed latency unless disabled, latency may be shared between classes
+        self.latency = latency or (AdaptiveTimeouts() if adaptive else None)
+        self.engine = engine
+        self.browser_profile = browser_profile
+        self.user_data_dir = user_data_dir
+        self.driver_pool = driver_pool
+        self.selectors = SelectorRegistry(selector_version)
+        self.journal = journal
+        self.class_name = class_name
+        self.class_url = class_url  # attendance page to open first, None keeps the current page
+        self.shards = shards        # browsers to split the roster across, 1 keeps a single browser
+        self.timings = TimingRecorder(class_name)
         
+    def spec(self):
+        """Picklable constructor arguments, used to rebuild this worker in a worker process"""
+        return {
+            'student_ids': list(self.student_ids),
+            'online_students': set(self.online_students),
+            'lesson_type': self.lesson_type,
+            'timeouts': dict(self.timeouts),
+            'engine': self.engine,
+            'browser_profile': self.browser_profile,
+            'user_data_dir': self.user_data_dir,
+            'selector_version': self.selectors.version,
+            'class_name': self.class_name,
+            'skip_correct': self.skip_correct,
+            'class_url': self.class_url,
+            'retry_attempts': self.retry_attempts,
+            'adaptive': self.latency is not None,
+            'shards': self.shards,
+        }
+
     def initialize_browser(self):
         # Only initialize if we don't already have a browser
         if self.driver is None:
             try:
-                chrome_options = Options()
-                chrome_options.add_argument('--start-maximized')
-                chrome_options.add_argument('--log-level=3')
-                self.driver = webdriver.Chrome(options=chrome_options)
-                self.wait = WebDriverWait(self.driver, 20)
-                self.driver.get('http://quanly.bgo.edu.vn/')
-                self.driver.execute_script("document.body.style.zoom='67%'")
+                self.driver = start_browser(self.browser_profile, self.user_data_dir)
+                self.wait = WebDriverWait(self.driver, self.timeouts['element'])
                 logging.info("Browser initialized successfully")
                 
-                # Add page refresh detection
+                # Add page refresh detection and save request tracking
                 self.setup_refresh_detection()
+                self.setup_network_tracking()
                 
                 return True
             except Exception as e:
@@ -60,16 +1152,18 @@ class ClassAttendanceWorker:
         else:
             # We already have a browser, just make sure we have a wait object
             if self.wait is None:
-                self.wait = WebDriverWait(self.driver, 20)
+                self.wait = WebDriverWait(self.driver, self.timeouts['element'])
                 
             # Check if we need to re-navigate to the attendance page
             try:
                 current_url = self.driver.current_url
                 if "class-attendances" not in current_url:
                     logging.info("Browser not on attendance page, redirecting...")
-                    self.driver.get('http://quanly.bgo.edu.vn/')
+                    self.driver.get(BGO_URL)
+                    self.selectors.invalidate()
                     # Add refresh detection again after navigation
                     self.setup_refresh_detection()
+                    self.setup_network_tracking()
             except:
                 logging.warning("Could not check browser URL, continuing anyway")
                 
@@ -90,112 +1184,732 @@ class ClassAttendanceWorker:
         except Exception as e:
             logging.error(f"Failed to add refresh detection: {str(e)}")
 
+    def setup_network_tracking(self):
+        """Count in-flight XHR/fetch requests so saves can be awaited instead of slept on"""
+        try:
+            js_code = """
+            if (!window.__bgoNetworkHooked) {
+                window.__bgoNetworkHooked = true;
+                window.__bgoPendingRequests = 0;
+                var done = function() {
+                    window.__bgoPendingRequests = Math.max(0, window.__bgoPendingRequests - 1);
+                };
+                var originalSend = XMLHttpRequest.prototype.send;
+                XMLHttpRequest.prototype.send = function() {
+                    window.__bgoPendingRequests++;
+                    this.addEventListener('loadend', done);
+                    return originalSend.apply(this, arguments);
+                };
+                if (window.fetch) {
+                    var originalFetch = window.fetch;
+                    window.fetch = function() {
+                        window.__bgoPendingRequests++;
+                        return originalFetch.apply(this, arguments).finally(done);
+                    };
+                }
+            }
+            """
+            self.driver.execute_script(js_code)
+            logging.info("Network tracking script added")
+        except Exception as e:
+            logging.error(f"Failed to add network tracking: {str(e)}")
+
+    def checkpoint(self):
+        """Called between students: blocks while paused, False once the run is cancelled"""
+        if self.control is None or self.cancelled:
+            return not self.cancelled
+        if not self.control.wait_if_paused():
+            logging.info(f"{self.class_name or 'Class'} cancelled, {self.remaining()} students left unprocessed")
+            self.cancelled = True
+        return not self.cancelled
+
+    def remaining(self):
+        """Students not yet marked, skipped or reported, e.g. after a cancel"""
+        return len(self.student_ids) - len(self.settled)
+
+    def timeout(self, key):
+        """Timeout for a wait, from the latency estimate when adaptive"""
+        if self.latency is None:
+            return self.timeouts[key]
+        return self.latency.timeout(key, self.timeouts[key])
+
+    def observe(self, key, seconds):
+        if self.latency is not None:
+            self.latency.observe(key, seconds)
+
+    def wait_until(self, key, condition, poll_frequency=0.05, observe_timeout=True, observe=True):
+        """WebDriverWait using timeout(key), the time it took is fed back into the estimate unless observe is False"""
+        timeout = self.timeout(key)
+        start = time.perf_counter()
+        try:
+            result = WebDriverWait(self.driver, timeout, poll_frequency=poll_frequency).until(condition)
+        except TimeoutException:
+            if observe and observe_timeout:
+                self.observe(key, timeout)
+            raise
+        if observe:
+            self.observe(key, time.perf_counter() - start)
+        return result
+
+    def wait_for_page_ready(self):
+        """Wait until the document has finished loading"""
+        try:
+            WebDriverWait(self.driver, self.timeouts['page_ready'], poll_frequency=0.1).until(
+                lambda driver: driver.execute_script("return document.readyState") == 'complete'
+            )
+        except TimeoutException:
+            logging.warning("Page did not finish loading in time, continuing anyway")
+
+    def wait_for_network_idle(self):
+        """Wait until no tracked XHR/fetch request is in flight"""
+        try:
+            self.wait_until('network_idle', lambda driver: driver.execute_script("return !window.__bgoPendingRequests"))
+            return True
+        except TimeoutException:
+            logging.warning("Save requests still pending after timeout, continuing anyway")
+            return False
+
+    def wait_for_select_value(self, student_id, col_id, value):
+        """Wait until the select of the student's own row in a column shows the chosen value.
+
+        The row is located again on every poll because ag-grid may re-render it, and it is
+        matched on the exact ID because filtering 234 also shows 1234.
+        """
+        selectors = self.row_selectors()
+        
+        def committed(driver):
+            row = driver.execute_script(READ_ROW_VALUES_JS, student_id, [col_id], selectors)
+            return bool(row) and row['values'].get(col_id) == value
+        
+        try:
+            self.wait_until('select_commit', committed)
+            return True
+        except TimeoutException:
+            logging.warning(f"Column {col_id} did not show value {value} in time, continuing anyway")
+            return False
+
+    def wait_for_cell_saved(self, col_id, value, student_id):
+        """Wait for a changed cell to be committed and its save request to finish"""
+        self.wait_for_select_value(student_id, col_id, value)
+        if self.save_tracker is None:
+            self.wait_for_network_idle()
+        else:
+            self.confirm_save(col_id, student_id)
+
+    def confirm_save(self, col_id, student_id):
+        """Raise unless the save requests caused by the change all succeeded"""
+        timeout = self.timeout('network_idle')
+        start = time.perf_counter()
+        try:
+            saves = self.save_tracker.wait(timeout)
+        except TimeoutException:
+            self.observe('network_idle', timeout)
+            raise Exception(f"Yêu cầu lưu ô {col_id} chưa hoàn tất")
+        
+        if not saves:
+            if not self.save_tracker.seen_save:
+                # The page never saved over XHR/fetch, so there is nothing to confirm against
+                logging.warning("No save request seen, falling back to the in-page request counter")
+                self.save_tracker = None
+                self.wait_for_network_idle()
+                return
+            raise Exception(f"Không thấy yêu cầu lưu ô {col_id}")
+        self.observe('network_idle', time.perf_counter() - start)
+        
+        for save in saves:
+            self.save_results.append(dict(save, student_id=student_id, column=col_id))
+            if save['latency'] is not None:
+                self.timings.record('save_request', save['latency'], student_id)
+        failed = next((save for save in saves if save['error'] or (save['status'] or 0) >= 400), None)
+        if failed:
+            raise Exception(f"Lưu ô {col_id} thất bại ({failed['status'] or failed['error']})")
+
+    def save_statuses(self):
+        """Confirmed save requests counted by HTTP status or network error"""
+        counts = {}
+        for save in self.save_results:
+            key = str(save['status'] or save['error'])
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
     def check_for_refresh(self):
         """Check if the page was refreshed and handle accordingly"""
         try:
-            was_refreshed = self.driver.execute_script("return window.wasRefreshed === true")
+            # A full reload also drops our injected hooks, so a missing hook means a refresh
+            was_refreshed = self.driver.execute_script(
+                "return window.wasRefreshed === true || window.__bgoNetworkHooked !== true"
+            )
             if was_refreshed:
                 logging.info("Page refresh detected, re-initializing elements")
+                self.selectors.invalidate()
                 # Reset the flag
                 self.driver.execute_script("window.wasRefreshed = false")
                 # Wait for page to load after refresh
-                time.sleep(2)
+                self.wait_for_page_ready()
                 # Re-setup refresh detection
                 self.setup_refresh_detection()
+                self.setup_network_tracking()
                 return True
             return False
         except Exception as e:
             logging.error(f"Error checking for refresh: {str(e)}")
             return False
 
-    def process_student(self, student_id):
-        try:
-            logging.info(f"Processing student: {student_id}")
-            
-            # Check if page was refreshed and handle it
-            self.check_for_refresh()
-            
+    def attendance_values(self, student_id):
+        """Values to select for a student, keyed by grid column id"""
+        if self.lesson_type == "review":
+            attendance_value = "2"
+        else:
+            attendance_value = "2" if student_id in self.online_students else "1"
+        values = {'arrivalStatus': 'ON_TIME', '4': attendance_value}
+        if self.lesson_type != "review":
+            values['10'] = "1" if self.lesson_type == "theory" else "2"
+        return values
+
+    def find_search_input(self, student_id=None):
+        """Return the grid's search box, cached until a refresh is detected"""
+        def resolve():
             # Try to find the search input with retry logic
             max_retries = 3
             for attempt in range(max_retries):
+                start = time.perf_counter()
                 try:
-                    find = self.wait.until(EC.presence_of_element_located((
-                        By.XPATH, '/html/body/bgo-root/div/div/bgo-main-layout/bgo-class-attendances/div/div[4]/bgo-grid/div/div[1]/div[6]/div/input'
+                    return self.wait.until(EC.presence_of_element_located((
+                        By.CSS_SELECTOR, self.selectors.css('search_input')
                     )))
-                    break
                 except Exception as e:
+                    self.timings.record('search_retry', time.perf_counter() - start, student_id)
                     if attempt == max_retries - 1:
                         raise
                     logging.warning(f"Attempt {attempt+1}/{max_retries} to find search box failed, retrying...")
-                    time.sleep(1)
-                    # Check if we need to handle a refresh
-                    if self.check_for_refresh():
-                        time.sleep(1)  # Wait for page to stabilize after refresh
+                    # Check if we need to handle a refresh, otherwise let the page settle
+                    if not self.check_for_refresh():
+                        self.wait_for_page_ready()
+        
+        with self.timings.phase('search_box', student_id):
+            return self.selectors.cached('search_input', resolve)
+
+    def row_selectors(self):
+        """Selector strings for READ_ROW_VALUES_JS, the cell selector keeps its {col_id} placeholder"""
+        selectors = {name: self.selectors.css(name) for name in ('data_row', 'select')}
+        selectors['cell'] = self.selectors.selectors['cell']
+        return selectors
+
+    def read_student_row(self, student_id, col_ids, observe=True):
+        """Wait for the student's own filtered row, returns its select values and elements in one script call.
+
+        Only the wait right after filtering measures the grid, pass observe=False for later lookups.
+        """
+        selectors = self.row_selectors()
+        try:
+            return self.wait_until(
+                'row_appear',
+                lambda driver: driver.execute_script(READ_ROW_VALUES_JS, student_id, col_ids, selectors),
+                observe_timeout=False,
+                observe=observe
+            )
+        except TimeoutException:
+            raise self.missing_row_error()
+
+    def missing_row_error(self):
+        """Error for a filtered row that never appeared, permanent if the grid shows no rows at all"""
+        try:
+            no_rows = self.driver.execute_script(
+                "return !!document.querySelector(arguments[0])", self.selectors.css('no_rows')
+            )
+        except Exception:
+            no_rows = False
+        if not no_rows:
+            # Only a slow grid counts towards the row estimate, a missing student says nothing
+            self.observe('row_appear', self.timeout('row_appear'))
+        return Exception(STUDENT_NOT_IN_CLASS if no_rows else "Không tìm thấy học sinh trong danh sách")
+
+    def read_grid_values(self):
+        """Current values of the students' rows in one scripted pass over the unfiltered grid.
+
+        Students missing from the result were not rendered and are checked one by one.
+        """
+        col_ids = sorted({col_id for student_id in self.student_ids for col_id in self.attendance_values(student_id)})
+        options = {
+            'selectors': {
+                name: self.selectors.css(name) for name in ('search_input', 'data_row', 'select', 'grid_viewport')
+            },
+            'settleMs': int(self.timeout('row_appear') * 1000),
+        }
+        options['selectors']['cell'] = self.selectors.selectors['cell']
+        try:
+            with self.timings.phase('grid_read'):
+                self.driver.set_script_timeout(self.timeouts['page_ready'] + self.timeouts['element'])
+                response = self.driver.execute_async_script(READ_GRID_VALUES_JS, list(self.student_ids), col_ids, options)
+            if not isinstance(response, dict) or 'values' not in response:
+                raise Exception((response or {}).get('__error__', "Kết quả không hợp lệ"))
+        except Exception as e:
+            logging.warning(f"Grid could not be read in one pass ({str(e)}), checking students one by one")
+            return {}
+        logging.info(f"Read {len(response['values'])}/{len(self.student_ids)} rows of the grid in one pass")
+        return response['values']
+
+    def already_correct(self, student_id):
+        """True if the grid pass saw the student's row holding every value already.
+
+        Each entry is used once, a later retry of the student reads its row again.
+        """
+        if self.grid_values is None:
+            self.grid_values = self.read_grid_values()
+        current = self.grid_values.pop(student_id, None)
+        return current is not None and all(
+            current.get(col_id) == value for col_id, value in self.attendance_values(student_id).items()
+        )
+
+    def process_student(self, student_id):
+        start = time.perf_counter()
+        with self.timings.phase('student', student_id):
+            result = self._process_student(student_id)
+        self.durations[student_id] = time.perf_counter() - start
+        return result
+
+    def _process_student(self, student_id):
+        try:
+            logging.info(f"Processing student: {student_id}")
             
-            find.clear()
-            find.send_keys(student_id)
+            # Check if page was refreshed and handle it
+            with self.timings.phase('refresh_check', student_id):
+                self.check_for_refresh()
             
-            try:
-                WebDriverWait(self.driver, 0.5).until(
-                    EC.presence_of_element_located((
-                        By.XPATH, "//div[@role='row' and contains(@class, 'ag-row') and not(contains(@class, 'ag-row-header'))]"
-                    ))
-                )
-            except TimeoutException:
-                raise Exception("Không tìm thấy học sinh trong danh sách")
+            if self.skip_correct and self.already_correct(student_id):
+                # Seen correct in the one pass over the grid, no filtering needed
+                logging.info(f"Student {student_id} already correct, skipped")
+                self.skipped_students.append(student_id)
+                return None
             
-            div_1 = self.wait.until(EC.presence_of_all_elements_located(
-                (By.XPATH, "//div[@col-id='arrivalStatus']")
-            ))[1]
-            option_1 = div_1.find_element(By.XPATH, '//option[@value="ON_TIME"]')
-            option_1.click()
-            time.sleep(0.5)  # Reduced sleep time to improve responsiveness
+            find = self.find_search_input(student_id)
+            with self.timings.phase('filter', student_id):
+                try:
+                    find.clear()
+                    find.send_keys(student_id)
+                except StaleElementReferenceException:
+                    # The grid was rebuilt without a full page reload
+                    self.selectors.invalidate()
+                    find = self.find_search_input(student_id)
+                    find.clear()
+                    find.send_keys(student_id)
             
-            div_2 = self.wait.until(EC.presence_of_all_elements_located(
-                (By.XPATH, "//div[@col-id='4']")
-            ))[1]
-            select_2 = div_2.find_element(By.XPATH, '//select')
-            if self.lesson_type == "review":
-                attendance_value = "2"
-            else:
-                attendance_value = "2" if student_id in self.online_students else "1"
-            option_2 = select_2.find_elements(By.XPATH, f'//option[@value="{attendance_value}"]')[1]
-            option_2.click()
-            time.sleep(0.5)  # Reduced sleep time
+            values = self.attendance_values(student_id)
+            # Wait for this student's row, the previous student's row stays on screen until the filter applies
+            with self.timings.phase('row_wait', student_id):
+                row = self.read_student_row(student_id, list(values))
+            if self.skip_correct:
+                # Only write the cells whose current value differs
+                values = {col_id: value for col_id, value in values.items() if row['values'].get(col_id) != value}
+                if not values:
+                    logging.info(f"Student {student_id} already correct, skipped")
+                    self.skipped_students.append(student_id)
+                    return None
             
-            if self.lesson_type != "review":
-                div_3 = self.wait.until(EC.presence_of_all_elements_located(
-                    (By.XPATH, "//div[@col-id='10']")
-                ))[1]
-                select_3 = div_3.find_element(By.XPATH, '//select')
-                
-                notebook_value = "1" if self.lesson_type == "theory" else "2"
-                option_3 = select_3.find_elements(By.XPATH, f'//option[@value="{notebook_value}"]')[-1]
-                option_3.click()
-                time.sleep(1)  # Reduced sleep time
+            # Each option is looked up inside the student's own row
+            for index, col_id in enumerate(values):
+                value = values[col_id]
+                with self.timings.phase(f'select_{col_id}', student_id):
+                    if index:
+                        # A save may have re-rendered the row, locate it again. The row is already
+                        # filtered, so this near-instant lookup must not pull the row estimate down
+                        row = self.read_student_row(student_id, list(values), observe=False)
+                    select = row['selects'].get(col_id)
+                    if select is None:
+                        raise Exception(f"Không tìm thấy ô {col_id}")
+                    if row['values'].get(col_id) == value:
+                        # Choosing the selected option fires no change and no save request to confirm
+                        continue
+                    try:
+                        option = select.find_element(By.CSS_SELECTOR, self.selectors.css('option', value=value))
+                    except NoSuchElementException:
+                        # Permanent, retrying the student cannot add the option
+                        raise Exception(f"{NO_OPTION_ERROR} {value} ở ô {col_id}")
+                    if self.save_tracker is not None:
+                        self.save_tracker.mark()
+                    option.click()
+                with self.timings.phase(f'save_wait_{col_id}', student_id):
+                    self.wait_for_cell_saved(col_id, value, student_id)
             
             return None
         except Exception as e:
-            return (student_id, str(e))
+            return (student_id, error_message(e))
+
+    def process_students_batch(self, student_ids):
+        """Mark a chunk of students with a single in-page script call.
+
+        Returns {student_id: None or (student_id, error)} like process_student.
+        Falls back to per-student processing if the script itself cannot run.
+        """
+        outcomes = {}
+        if self.skip_correct:
+            # Students seen correct in the grid pass are not sent to the page at all
+            self.check_for_refresh()
+            for student_id in student_ids:
+                if self.already_correct(student_id):
+                    self.skipped_students.append(student_id)
+                    outcomes[student_id] = None
+            student_ids = [student_id for student_id in student_ids if student_id not in outcomes]
+            if not student_ids:
+                return outcomes
+        
+        # Rows are searched, filled and saved one after another inside the page
+        per_student = self.timeout('row_appear') + 3 * (self.timeout('select_commit') + self.timeout('network_idle'))
+        options = {
+            'selectors': {
+                name: self.selectors.css(name) for name in ('search_input', 'data_row', 'select', 'no_rows')
+            },
+            'rowMs': int(self.timeout('row_appear') * 1000),
+            'elementMs': int(self.timeout('select_commit') * 1000),
+            'commitMs': int(self.timeout('select_commit') * 1000),
+            'idleMs': int(self.timeout('network_idle') * 1000),
+            'skipCorrect': self.skip_correct,
+            'notInClass': STUDENT_NOT_IN_CLASS,
+        }
+        # The cell selector is filled in per column inside the page
+        options['selectors']['cell'] = self.selectors.selectors['cell']
+        try:
+            self.check_for_refresh()
+            self.driver.set_script_timeout(per_student * len(student_ids) + self.timeouts['element'])
+            students = [[student_id, list(self.attendance_values(student_id).items())] for student_id in student_ids]
+            start = time.perf_counter()
+            response = self.driver.execute_async_script(BATCH_ATTENDANCE_JS, students, options)
+            chunk_seconds = time.perf_counter() - start
+            self.timings.record('batch_chunk', chunk_seconds)
+            if not isinstance(response, dict) or 'results' not in response:
+                raise Exception((response or {}).get('__error__', "Kết quả không hợp lệ"))
+        except Exception as e:
+            logging.warning(f"Batch script failed ({str(e)}), falling back to per-student processing")
+            outcomes.update((student_id, self.process_student(student_id)) for student_id in student_ids)
+            return outcomes
+        
+        results = response['results']
+        self.skipped_students.extend(response.get('skipped', []))
+        # The page does not report per-student times, spread the chunk evenly
+        for student_id in student_ids:
+            self.timings.record('student', chunk_seconds / len(student_ids), student_id)
+            self.durations[student_id] = chunk_seconds / len(student_ids)
+        for student_id in student_ids:
+            error = results.get(student_id, "Không có kết quả từ trình duyệt")
+            outcomes[student_id] = (student_id, error) if error else None
+        failed = sum(1 for result in outcomes.values() if result)
+        logging.info(f"Batch of {len(student_ids)} students processed, {failed} failed")
+        return outcomes
+
+    def save_student_api(self, client, student_id):
+        if not self.checkpoint():
+            raise JobCancelled()
+        start = time.perf_counter()
+        with self.timings.phase('api_save', student_id):
+            status = client.save_student(student_id, self.attendance_values(student_id))
+        self.durations[student_id] = time.perf_counter() - start
+        return status
+
+    def process_students_api(self, client):
+        """Submit all students through the backend API, yielding progress.
+
+        Students whose request fails are retried through the browser.
+        """
+        total = len(self.student_ids)
+        done = 0
+        with ThreadPoolExecutor(max_workers=client.pool_size, thread_name_prefix='attendance-api') as pool:
+            futures = {
+                pool.submit(self.save_student_api, client, student_id): student_id
+                for student_id in self.student_ids
+            }
+            for future in as_completed(futures):
+                student_id = futures[future]
+                if self.cancelled:
+                    # Drop requests that have not started, finished ones are still recorded
+                    for pending in futures:
+                        pending.cancel()
+                try:
+                    future.result()
+                    result = None
+                except (JobCancelled, CancelledError):
+                    continue
+                except Exception as e:
+                    logging.warning(f"API save failed for {student_id} ({str(e)}), using the browser instead")
+                    result = self.process_student(student_id)
+                self.record_result(student_id, result)
+                done += 1
+                yield done, total
+
+    def open_class_page(self):
+        """Navigate to class_url unless the browser is already showing it"""
+        if not self.class_url or self.driver.current_url == self.class_url:
+            return
+        logging.info(f"Opening class page {self.class_url}")
+        self.load_page(self.class_url)
+
+    def load_page(self, url=None):
+        """Open url, or reload the current page, and instrument it again"""
+        if url:
+            self.driver.get(url)
+        else:
+            self.driver.refresh()
+        self.wait_for_page_ready()
+        self.selectors.invalidate()
+        self.setup_refresh_detection()
+        self.setup_network_tracking()
+
+    def record_result(self, student_id, result, final=False):
+        """Keep a failure for the report or checkpoint a success in the journal"""
+        duration = self.durations.pop(student_id, None)
+        if result:
+            if not final and self.retry_attempts > 1 and is_transient_error(result[1]):
+                # Retried at the end of the class, reported only if every attempt fails
+                self.retry_queue.append(result)
+                outcome = 'retry'
+            else:
+                self.failed_students.append(result)
+                self.settled.add(student_id)
+                outcome = 'failed'
+        else:
+            self.settled.add(student_id)
+            outcome = 'skipped' if student_id in self.skipped_students else 'ok'
+            if self.journal and self.class_name:
+                try:
+                    self.journal.record(self.class_name, self.lesson_type, student_id)
+                except OSError as e:
+                    logging.error(f"Failed to write journal entry for {student_id}: {str(e)}")
+        
+        message = f"Student {student_id}: {outcome}" + (f" ({result[1]})" if result else "")
+        log_event(message, logging.WARNING if outcome == 'failed' else logging.INFO,
+                  class_name=self.class_name, student=student_id, phase=self.engine,
+                  duration=round(duration, 4) if duration is not None else None, outcome=outcome)
+
+    def retry_failed(self):
+        """Re-run queued transient failures in rounds, with backoff and a page reload in between"""
+        total = len(self.student_ids)
+        for attempt in range(2, self.retry_attempts + 1):
+            if not self.retry_queue or not self.checkpoint():
+                break
+            queued, self.retry_queue = self.retry_queue, []
+            delay = RETRY_BACKOFF * 2 ** (attempt - 2)
+            logging.info(f"Retrying {len(queued)} students in {delay:.1f}s (attempt {attempt}/{self.retry_attempts})")
+            time.sleep(delay)
+            with self.timings.phase('retry_reload'):
+                try:
+                    self.load_page()
+                except Exception as e:
+                    logging.warning(f"Page reload before retry failed: {str(e)}")
+            
+            for index, (student_id, _) in enumerate(queued):
+                if not self.checkpoint():
+                    self.retry_queue.extend(queued[index:])
+                    break
+                result = self.process_student(student_id)
+                self.record_result(student_id, result, final=attempt == self.retry_attempts)
+                if not result:
+                    self.recovered_students.append(student_id)
+            yield total, total
+        
+        # Cancelled before their retry came up, report them with their last error
+        for result in self.retry_queue:
+            self.failed_students.append(result)
+            self.settled.add(result[0])
+        self.retry_queue = []
+
+    def open_shard_browser(self, url):
+        """Another browser on the class page with this browser's session, from the pool if one is idle"""
+        driver = self.driver_pool.lease(timeout=0) if self.driver_pool else None
+        leased = driver is not None
+        if driver is None:
+            # No start page, clone_session opens the class page directly
+            load_selenium()
+            driver = webdriver.Chrome(options=build_chrome_options(self.browser_profile))
+        try:
+            clone_session(self.driver, driver, url)
+        except Exception:
+            self.close_shard_browser(driver, leased, broken=True)
+            raise
+        return driver, leased
+
+    def close_shard_browser(self, driver, leased, broken=False):
+        if leased:
+            self.driver_pool.release(driver, broken=broken)
+            return
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def shard_worker(self, student_ids, driver, url):
+        """Worker for a slice of this class on driver, sharing journal, latency and control"""
+        worker = ClassAttendanceWorker(
+            # An API fallback already failed once, the slices go straight to the browser
+            **dict(self.spec(), student_ids=student_ids, class_url=url, shards=1,
+                   engine='ui' if self.engine == 'api' else self.engine),
+            journal=self.journal, latency=self.latency, control=self.control
+        )
+        worker.driver = driver
+        worker.wait = WebDriverWait(driver, worker.timeouts['element'])
+        return worker
+
+    def merge_shard(self, shard):
+        self.failed_students.extend(shard.failed_students)
+        self.skipped_students.extend(shard.skipped_students)
+        self.recovered_students.extend(shard.recovered_students)
+        self.save_results.extend(shard.save_results)
+        self.settled.update(shard.settled)
+        self.cancelled = self.cancelled or shard.cancelled
+        self.timings.merge(shard.timings)
+
+    def run_shards(self, shards, done_before=0):
+        """Run shard workers on threads and yield their combined progress.
+
+        Returns {shard index: exception} for shards whose browser failed.
+        """
+        progress = [0] * len(shards)
+        errors = {}
+        updates = queue.Queue()
+        
+        def run(index, shard):
+            try:
+                for current, _ in shard.process_class():
+                    progress[index] = current
+                    updates.put(index)
+            except Exception as e:
+                logging.error(f"Shard {index} of {self.class_name or 'class'} failed: {str(e)}")
+                errors[index] = e
+            finally:
+                updates.put(None)
+        
+        for index, shard in enumerate(shards):
+            threading.Thread(target=run, args=(index, shard), daemon=True, name=f'shard-{index}').start()
+        running = len(shards)
+        while running:
+            if updates.get() is None:
+                running -= 1
+                continue
+            yield done_before + sum(progress), len(self.student_ids)
+        return errors
+
+    def process_sharded(self):
+        """Split the roster across extra browsers on the same class page and merge the results"""
+        count = min(self.shards, max(1, len(self.student_ids) // SHARD_MIN_STUDENTS))
+        url = self.driver.current_url
+        extra = []
+        if count > 1:
+            with ThreadPoolExecutor(max_workers=count - 1, thread_name_prefix='shard-open') as executor:
+                futures = [executor.submit(self.open_shard_browser, url) for _ in range(count - 1)]
+            for future in futures:
+                try:
+                    extra.append(future.result())
+                except Exception as e:
+                    logging.warning(f"Extra browser for sharding failed to start: {str(e)}")
+        
+        drivers = [self.driver] + [driver for driver, _ in extra]
+        logging.info(f"Sharding {len(self.student_ids)} students across {len(drivers)} browsers")
+        shards = [self.shard_worker(self.student_ids[index::len(drivers)], driver, url)
+                  for index, driver in enumerate(drivers)]
+        errors = {}
+        try:
+            errors = yield from self.run_shards(shards)
+            for shard in shards:
+                self.merge_shard(shard)
+            if 0 in errors:
+                # The class's own browser failed, report it like an unsharded run
+                raise errors[0]
+            
+            # Students left by a failed extra browser are finished on the main one
+            leftover = [student_id for index in errors for student_id in shards[index].student_ids
+                        if student_id not in shards[index].settled]
+            if leftover and not self.cancelled:
+                logging.warning(f"Finishing {len(leftover)} students of failed shards on the main browser")
+                shard = self.shard_worker(leftover, self.driver, url)
+                retry_errors = yield from self.run_shards([shard], done_before=len(self.settled))
+                self.merge_shard(shard)
+                if retry_errors:
+                    raise retry_errors[0]
+        finally:
+            for index, (driver, leased) in enumerate(extra, start=1):
+                self.close_shard_browser(driver, leased, broken=index in errors)
 
     def process_class(self):
+        if not self.student_ids:
+            return self.failed_students
+        
         should_quit_browser = False
+        leased_from_pool = False
+        if not self.driver and self.driver_pool and self.class_url:
+            # A warm pooled browser avoids paying Chrome start-up for this class.
+            # It starts on the home page, so only a class with its own URL can use one
+            self.driver = self.driver_pool.lease(timeout=self.timeouts['page_ready'])
+            if self.driver:
+                leased_from_pool = True
+                self.wait = WebDriverWait(self.driver, self.timeouts['element'])
+                logging.info("Using a pooled browser")
+        
         if not self.driver:
             if not self.initialize_browser():
-                return [(None, "Không thể khởi động trình duyệt")]
+                # Report through failed_students so callers driving the generator see it
+                self.failed_students.append((None, "Không thể khởi động trình duyệt"))
+                return self.failed_students
             should_quit_browser = True  # Only quit if we created the browser here
+        else:
+            # Browsers opened from the GUI or the pool have not been instrumented yet
+            self.setup_refresh_detection()
+            self.setup_network_tracking()
             
+        crashed = False
         try:
+            self.open_class_page()
+            self.save_tracker = SaveTracker.attach(self.driver)
+            
+            if self.engine == 'api':
+                client = ApiAttendanceClient(self.driver, timeout=self.timeout('network_idle'))
+                if self.skip_correct:
+                    # Only the grid shows which cells are already correct, the API cannot read them
+                    logging.warning("API engine cannot skip correct cells, using the browser instead")
+                elif client.is_configured() and client.load_session():
+                    yield from self.process_students_api(client)
+                    yield from self.retry_failed()
+                    return self.failed_students
+                else:
+                    logging.warning("API engine is not available, using the browser instead")
+            
+            if self.shards > 1:
+                yield from self.process_sharded()
+                return self.failed_students
+            
+            if self.engine == 'batch':
+                total = len(self.student_ids)
+                for start in range(0, total, BATCH_SIZE):
+                    if not self.checkpoint():
+                        break
+                    chunk = self.student_ids[start:start + BATCH_SIZE]
+                    for student_id, result in self.process_students_batch(chunk).items():
+                        self.record_result(student_id, result)
+                    
+                    # Yield progress after each chunk for UI updates
+                    yield start + len(chunk), total
+                yield from self.retry_failed()
+                return self.failed_students
+            
             for i, student_id in enumerate(self.student_ids):
+                # Pause or stop only between students, never halfway through a row
+                if not self.checkpoint():
+                    break
                 result = self.process_student(student_id)
-                if result:
-                    self.failed_students.append(result)
+                self.record_result(student_id, result)
                 
                 # Yield progress after each student for UI updates
                 yield i + 1, len(self.student_ids)
+            
+            yield from self.retry_failed()
                     
+        except Exception:
+            crashed = True
+            raise
         finally:
-            if should_quit_browser and self.driver:
+            if self.latency is not None:
+                logging.info(f"Adaptive timeouts after {self.class_name or 'class'}: {self.latency.snapshot(self.timeouts)}")
+            if leased_from_pool:
+                self.driver_pool.release(self.driver, broken=crashed)
+                self.driver = None
+            elif should_quit_browser and self.driver:
                 try:
                     self.driver.quit()
                 except:
@@ -203,12 +1917,712 @@ class ClassAttendanceWorker:
                     
         return self.failed_students
 
+class ApiAttendanceClient:
+    """Write attendance straight to the backend with the browser's logged-in session"""
+    def __init__(self, driver, config=None, timeout=5):
+        self.driver = driver
+        self.config = dict(API_CONFIG, **(config or {}))
+        self.timeout = timeout
+        self.pool_size = self.config['pool_size']
+        self.session = None
+        self.class_id = None
+
+    def is_configured(self):
+        return api_configured(self.config)
+
+    def load_session(self):
+        """Copy cookies and the bearer token from the Selenium driver into a pooled session"""
+        try:
+            # Only the API engine needs requests, a missing install falls back to the browser
+            import requests
+            import requests.adapters
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            
+            for cookie in self.driver.get_cookies():
+                session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+                # Angular sends the XSRF cookie back as a header
+                if cookie['name'] == 'XSRF-TOKEN':
+                    session.headers['X-XSRF-TOKEN'] = cookie['value']
+            
+            token = self.driver.execute_script(
+                "var keys = arguments[0];"
+                "for (var i = 0; i < keys.length; i++) {"
+                "  var value = localStorage.getItem(keys[i]) || sessionStorage.getItem(keys[i]);"
+                "  if (value) return value;"
+                "}"
+                "return null;",
+                self.config['token_keys']
+            )
+            if token:
+                # Tokens are often stored JSON-encoded with surrounding quotes
+                session.headers['Authorization'] = "Bearer " + token.strip('"')
+            
+            match = re.search(r'class-attendances/([^/?#]+)', self.driver.current_url)
+            self.class_id = match.group(1) if match else ''
+            self.session = session
+            logging.info("API session loaded from browser")
+            return True
+        except Exception as e:
+            logging.error(f"Failed to load API session from browser: {str(e)}")
+            return False
+
+    def save_student(self, student_id, values):
+        """Send one student's attendance values, raising on any HTTP error"""
+        url = self.config['base_url'].rstrip('/') + self.config['save_path'].format(
+            class_id=self.class_id, student_id=student_id
+        )
+        payload = {self.config['student_field']: student_id}
+        for col_id, value in values.items():
+            payload[self.config['fields'][col_id]] = value
+        
+        response = self.session.request(self.config['method'], url, json=payload, timeout=self.timeout)
+        if response.status_code >= 400:
+            raise Exception(f"API trả về lỗi {response.status_code}")
+        return response.status_code
+
+def api_configured(config=None):
+    """True once the save request of the backend has been filled into API_CONFIG"""
+    config = config or API_CONFIG
+    return bool(config['save_path'] and config['method'] and config['student_field']
+                and all(config['fields'].get(col_id) for col_id in API_COLUMNS))
+
+def engine_choices():
+    """Engines usable with the current configuration, the API engine needs API_CONFIG"""
+    return [key for key in ATTENDANCE_ENGINES if key != 'api' or api_configured()]
+
+def run_attendance_job(worker, tab_id, control=None):
+    """Run one worker and yield its start/progress/done events, or error/cancelled"""
+    # Classes still waiting for a slot honour pause and cancel before opening a browser
+    if control is not None and not control.wait_if_paused():
+        yield {'type': 'cancelled', 'tab_id': tab_id, 'remaining': len(worker.student_ids)}
+        return
+    yield {'type': 'start', 'tab_id': tab_id, 'total': len(worker.student_ids)}
+    reported = 0
+    try:
+        for current, total in worker.process_class():
+            # Failures reported since the last event, so the report can show them right away
+            failed = worker.failed_students[reported:]
+            reported += len(failed)
+            yield {'type': 'progress', 'tab_id': tab_id, 'current': current, 'total': total, 'failed': failed}
+        yield {
+            'type': 'done',
+            'tab_id': tab_id,
+            'failed_students': list(worker.failed_students),
+            'failed': worker.failed_students[reported:],
+            'skipped': len(worker.skipped_students),
+            'recovered': len(worker.recovered_students),
+            'save_statuses': worker.save_statuses(),
+            'cancelled': worker.cancelled,
+            'remaining': worker.remaining(),
+            'timings': worker.timings,
+        }
+    except Exception as e:
+        logging.error(f"Error in attendance worker: {str(e)}")
+        yield {'type': 'error', 'tab_id': tab_id, 'error': error_message(e), 'timings': worker.timings}
+
+class AttendanceJobRunner:
+    """Run ClassAttendanceWorker jobs on a background executor.
+
+    Workers never touch Tk; they post progress events to a thread-safe queue
+    that the GUI drains on a timer.
+    """
+    def __init__(self, max_workers=1, control=None):
+        self.events = queue.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='attendance')
+        self.control = control
+
+    def submit(self, worker, tab_id):
+        return self.executor.submit(self._run_worker, worker, tab_id)
+
+    def _run_worker(self, worker, tab_id):
+        for event in run_attendance_job(worker, tab_id, self.control):
+            self.events.put(event)
+
+    def drain(self):
+        """Return all pending events without blocking"""
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+def process_context():
+    """multiprocessing context for worker processes, imported only when the process backend is used"""
+    import multiprocessing
+    return multiprocessing.get_context(PROCESS_START_METHOD)
+
+def run_worker_process(slot, tasks, events, log_queue, control, journal_path):
+    """Entry point of a worker process: run class specs from tasks until a None sentinel.
+
+    Keeps one browser per user-data dir between classes and sends every event,
+    and every log record, back to the parent over IPC queues.
+    """
+    # The parent owns the log file, close this process's copy so rotation is not blocked
+    for handler in LOG_LISTENER.handlers:
+        handler.close()
+    logging.getLogger().handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    load_selenium()
+    journal = AttendanceJournal(journal_path) if journal_path else None
+    latency = AdaptiveTimeouts()  # shared by the classes of this process
+    driver, driver_dir = None, None
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            tab_id, spec = task
+            # Without a tab profile each slot reuses the pool_<n> profile, like DriverPool
+            spec['user_data_dir'] = spec['user_data_dir'] or profile_dir(f"pool_{slot}")
+            if driver is not None and (driver_dir != spec['user_data_dir'] or not is_browser_alive(driver)):
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+                driver = None
+            
+            worker = ClassAttendanceWorker(
+                journal=journal, latency=latency if spec.pop('adaptive') else None, control=control, **spec
+            )
+            if driver is None and (control is None or not control.cancelled):
+                try:
+                    driver, driver_dir = start_browser(spec['browser_profile'], spec['user_data_dir']), spec['user_data_dir']
+                except Exception as e:
+                    # The worker tries once more itself and reports the failure
+                    logging.error(f"Worker process {slot} could not start a browser: {str(e)}")
+            if driver is not None:
+                worker.driver = driver
+                worker.wait = WebDriverWait(driver, worker.timeouts['element'])
+            
+            for event in run_attendance_job(worker, tab_id, control):
+                if 'timings' in event:
+                    # TimingRecorder holds a lock, only its samples cross the process boundary
+                    event['timings'] = event['timings'].samples
+                event['slot'] = slot
+                events.put(event)
+    finally:
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+class ProcessJobRunner(AttendanceJobRunner):
+    """Run ClassAttendanceWorker jobs in separate OS processes.
+
+    Each slot is a long-lived process fed class specs over its own queue, so a
+    crashed browser or driver cannot take the GUI down. A slot that dies is
+    respawned and its class is submitted again with the students still missing
+    from the journal. Events arrive on the same queue as AttendanceJobRunner's.
+    """
+    def __init__(self, max_workers=1, control=None, max_respawns=PROCESS_MAX_RESPAWNS):
+        self.context = process_context()
+        self.events = queue.Queue()
+        # The control's events must come from the same context to reach the workers
+        self.control = control or JobControl(self.context)
+        self.max_respawns = max_respawns
+        self.journal_path = None
+        self._results = self.context.Queue()
+        self._logs = self.context.Queue()
+        self._log_listener = logging.handlers.QueueListener(
+            self._logs, *LOG_LISTENER.handlers, respect_handler_level=True
+        )
+        self._log_listener.start()
+        self._pending = collections.deque()   # (tab_id, spec, journal) not yet handed to a slot
+        self._assigned = {}                   # slot -> (tab_id, spec, journal) of the class it runs
+        self._offsets = {}                    # tab_id -> students finished before a respawn
+        self._failed = collections.defaultdict(list)  # tab_id -> student failures forwarded so far
+        self._carried = {}                    # tab_id -> failures of crashed processes, for the final event
+        self._respawns = collections.Counter()
+        self._slots = {}                      # slot -> (process, task queue)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._size = max_workers
+        self._monitor = threading.Thread(target=self._run_monitor, daemon=True, name='process-monitor')
+        self._monitor.start()
+
+    def submit(self, worker, tab_id):
+        """Queue a worker; it is rebuilt from worker.spec() in a worker process"""
+        journal = worker.journal
+        if journal is not None and self.journal_path is None:
+            self.journal_path = journal.path
+        with self._lock:
+            self._pending.append((tab_id, worker.spec(), journal))
+
+    def _spawn(self, slot):
+        tasks = self.context.Queue()
+        process = self.context.Process(
+            target=run_worker_process,
+            args=(slot, tasks, self._results, self._logs, self.control, self.journal_path),
+            name=f'attendance-{slot}', daemon=True
+        )
+        process.start()
+        self._slots[slot] = (process, tasks)
+        logging.info(f"Worker process {slot} started (pid {process.pid})")
+
+    def _dispatch(self):
+        with self._lock:
+            while self._pending:
+                idle = [slot for slot in range(self._size) if slot not in self._assigned]
+                if not idle:
+                    return
+                slot = idle[0]
+                tab_id, spec, journal = self._pending.popleft()
+                if self.control.cancelled:
+                    self.events.put({'type': 'cancelled', 'tab_id': tab_id, 'remaining': len(spec['student_ids'])})
+                    continue
+                if slot not in self._slots:
+                    self._spawn(slot)
+                self._assigned[slot] = (tab_id, spec, journal)
+                self._slots[slot][1].put((tab_id, spec))
+
+    def _forward(self, event):
+        slot = event.pop('slot')
+        tab_id = event['tab_id']
+        # A respawned class reports progress on top of what the crashed process finished
+        offset = self._offsets.get(tab_id, 0)
+        if event['type'] == 'start':
+            event['total'] += offset
+        elif event['type'] == 'progress':
+            event['current'] += offset
+            event['total'] += offset
+        if 'timings' in event:
+            timings = TimingRecorder()
+            timings.samples = event['timings']
+            event['timings'] = timings
+        self._failed[tab_id].extend(failure for failure in event.get('failed', ()) if failure[0] is not None)
+        if event['type'] == 'done':
+            # Failures a crashed process already reported belong to the class's result too
+            event['failed_students'] = self._carried.get(tab_id, []) + list(event['failed_students'])
+        if event['type'] in ('done', 'error', 'cancelled'):
+            self._failed.pop(tab_id, None)
+            self._carried.pop(tab_id, None)
+            with self._lock:
+                _, _, journal = self._assigned.pop(slot, (None, None, None))
+            if journal is not None:
+                # The worker process appended to the journal file, not to this copy
+                journal.reload()
+        self.events.put(event)
+
+    def _drain_results(self):
+        while True:
+            try:
+                self._forward(self._results.get_nowait())
+            except queue.Empty:
+                return
+
+    def _check_slots(self):
+        for slot, (process, _) in list(self._slots.items()):
+            if process.is_alive():
+                continue
+            # Events sent just before the exit may still be queued, a finished class must not run again
+            self._drain_results()
+            with self._lock:
+                del self._slots[slot]
+                assigned = self._assigned.pop(slot, None)
+            if self._closed:
+                continue
+            logging.error(f"Worker process {slot} exited unexpectedly (exit code {process.exitcode})")
+            if assigned is None:
+                continue
+            tab_id, spec, journal = assigned
+            self._respawns[tab_id] += 1
+            if self._respawns[tab_id] > self.max_respawns:
+                self.events.put({
+                    'type': 'error', 'tab_id': tab_id, 'timings': TimingRecorder(spec['class_name']),
+                    'error': f"Tiến trình xử lý bị dừng đột ngột (mã {process.exitcode})",
+                })
+                continue
+            
+            student_ids = spec['student_ids']
+            if journal is not None and spec['class_name']:
+                journal.reload()
+                student_ids = journal.remaining(spec['class_name'], spec['lesson_type'], student_ids)
+            # Students whose failure is already in the report are not tried again, it would show twice
+            self._carried[tab_id] = list(self._failed[tab_id])
+            reported = {student_id for student_id, _ in self._carried[tab_id]}
+            student_ids = [student_id for student_id in student_ids if student_id not in reported]
+            self._offsets[tab_id] = self._offsets.get(tab_id, 0) + len(spec['student_ids']) - len(student_ids)
+            logging.warning(f"Restarting class {tab_id} in a new process with {len(student_ids)} students left")
+            with self._lock:
+                # Ahead of classes that have not started yet
+                self._pending.appendleft((tab_id, dict(spec, student_ids=student_ids), journal))
+
+    def _run_monitor(self):
+        while not self._closed:
+            try:
+                self._forward(self._results.get(timeout=0.2))
+            except queue.Empty:
+                pass
+            except Exception as e:
+                logging.error(f"Worker process event could not be handled: {str(e)}")
+            self._check_slots()
+            self._dispatch()
+
+    def shutdown(self):
+        """Let idle worker processes exit; a class still running is left to finish"""
+        self._closed = True
+        for process, tasks in self._slots.values():
+            tasks.put(None)
+        self._log_listener.stop()
+
+def normalize_student_id(student_id):
+    """Normalize student ID by stripping leading zeros"""
+    return student_id.lstrip('0') or '0'  # Return '0' if ID is all zeros
+
+def validate_student_id(student_id):
+    student_id = student_id.strip()
+    if not student_id.isdigit():
+        return False, "Mã học sinh chỉ được chứa số"
+    if len(student_id) < 2 or len(student_id) > 6:
+        return False, "Độ dài mã học sinh không hợp lệ"
+    return True, ""
+
+def check_for_duplicates(id_list):
+    """Return every ID whose normalized form appears more than once"""
+    normalized_ids = {}
+    for id in id_list:
+        normalized_ids.setdefault(normalize_student_id(id), []).append(id)
+    
+    duplicates = []
+    for ids in normalized_ids.values():
+        if len(ids) > 1:
+            duplicates.extend(ids)
+    return duplicates
+
+def validate_student_list(student_ids):
+    """Validate a class's student IDs, returns (True, cleaned list) or (False, error message)"""
+    student_list = []
+    for student_id in student_ids:
+        student_id = str(student_id).strip()
+        is_valid, error_msg = validate_student_id(student_id)
+        if not is_valid:
+            return False, f"Mã học sinh không hợp lệ '{student_id}': {error_msg}"
+        student_list.append(student_id)
+    if not student_list:
+        return False, "Vui lòng nhập ít nhất một mã học sinh"
+    
+    # Check for duplicates (both exact and semantic)
+    exact_duplicates = check_for_duplicates(student_list)
+    if exact_duplicates:
+        return False, f"Có ID trùng lặp: {', '.join(exact_duplicates)}"
+    
+    normalized_ids = {}
+    semantic_duplicates = []
+    for id in student_list:
+        normalized = normalize_student_id(id)
+        if normalized in normalized_ids:
+            semantic_duplicates.append(f"{id} (trùng với {normalized_ids[normalized]})")
+        else:
+            normalized_ids[normalized] = id
+    if semantic_duplicates:
+        return False, f"Có ID trùng lặp (khác số 0): {', '.join(semantic_duplicates)}"
+    
+    return True, student_list
+
+class ClassRoster:
+    """Student IDs of one class, the data model behind a tab's list and statistics.
+
+    Keeps insertion order, an index of normalized IDs for O(1) duplicate checks
+    and running counts by ID length. Views subscribe to (event, ids) notifications
+    with event 'add', 'remove' or 'clear'.
+    """
+    def __init__(self, student_ids=()):
+        self._ids = {}          # student ID -> normalized ID, in insertion order
+        self._normalized = {}   # normalized ID -> student ID
+        self.counts = {'total': 0, 'digits_3': 0, 'digits_4': 0, 'other': 0}
+        self._listeners = []
+        if student_ids:
+            self.add_many(student_ids)
+
+    @property
+    def ids(self):
+        return list(self._ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def _notify(self, event, ids):
+        for listener in self._listeners:
+            listener(event, ids)
+
+    def _count(self, student_id, step):
+        self.counts['total'] += step
+        key = {3: 'digits_3', 4: 'digits_4'}.get(len(student_id), 'other')
+        self.counts[key] += step
+
+    def check(self, student_id):
+        """Error message for an ID that cannot be added, None if it can"""
+        is_valid, error_msg = validate_student_id(student_id)
+        if not is_valid:
+            return error_msg
+        if student_id in self._ids:
+            return "ID này đã tồn tại trong danh sách!"
+        existing_id = self._normalized.get(normalize_student_id(student_id))
+        if existing_id is not None:
+            return f"ID này đã tồn tại với dạng {existing_id}!"
+        return None
+
+    def add_many(self, student_ids):
+        """Validate and de-duplicate IDs in one pass and add the new ones.
+
+        Returns a dict with the added IDs and the invalid, duplicate and
+        semantic-duplicate (same ID with different leading zeros) ones that were dropped.
+        """
+        result = {'added': [], 'invalid': [], 'duplicates': [], 'semantic_duplicates': []}
+        for student_id in student_ids:
+            student_id = str(student_id).strip()
+            if not student_id:
+                continue
+            if not validate_student_id(student_id)[0]:
+                result['invalid'].append(student_id)
+                continue
+            if student_id in self._ids:
+                result['duplicates'].append(student_id)
+                continue
+            normalized = normalize_student_id(student_id)
+            if normalized in self._normalized:
+                result['semantic_duplicates'].append(f"{student_id} (trùng với {self._normalized[normalized]})")
+                continue
+            self._ids[student_id] = normalized
+            self._normalized[normalized] = student_id
+            self._count(student_id, 1)
+            result['added'].append(student_id)
+        if result['added']:
+            self._notify('add', result['added'])
+        return result
+
+    def remove(self, student_id):
+        normalized = self._ids.pop(student_id, None)
+        if normalized is None:
+            return False
+        del self._normalized[normalized]
+        self._count(student_id, -1)
+        self._notify('remove', [student_id])
+        return True
+
+    def clear(self):
+        self._ids.clear()
+        self._normalized.clear()
+        self.counts = dict.fromkeys(self.counts, 0)
+        self._notify('clear', [])
+
+def error_type(error):
+    """Report category of an error message, see ERROR_TYPES"""
+    message = str(error).lower()
+    for label, patterns in ERROR_TYPES:
+        if any(pattern.lower() in message for pattern in patterns):
+            return label
+    return OTHER_ERROR_TYPE
+
+class FailureLog:
+    """Failed students of every run in this session, the data model behind the report table.
+
+    Rows are dicts keyed like REPORT_COLUMNS, kept in arrival order. Views subscribe
+    to (event, rows) notifications with event 'add' or 'clear' and append instead
+    of redrawing.
+    """
+    def __init__(self):
+        self.rows = []
+        self.runs = 0
+        self._listeners = []
+
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def _notify(self, event, rows):
+        for listener in self._listeners:
+            listener(event, rows)
+
+    def start_run(self):
+        """Number of a new run, shown with each of its failures"""
+        self.runs += 1
+        return self.runs
+
+    def add(self, run, class_name, failures):
+        """Append (student_id, error) failures of one class, student_id None for class errors"""
+        now = time.strftime("%H:%M:%S", time.localtime())
+        rows = [{
+            'run': run,
+            'time': now,
+            'class': class_name,
+            'student_id': student_id or '',
+            'error_type': error_type(error),
+            'error': str(error),
+        } for student_id, error in failures]
+        self.rows.extend(rows)
+        self._notify('add', rows)
+
+    def clear(self):
+        self.rows = []
+        self._notify('clear', [])
+
+    def values(self, column):
+        return sorted({row[column] for row in self.rows})
+
+    def select(self, class_name=None, kind=None, sort=None, reverse=False):
+        """Rows of one class and/or error type, optionally sorted by a column"""
+        rows = [row for row in self.rows
+                if (not class_name or row['class'] == class_name) and (not kind or row['error_type'] == kind)]
+        if sort:
+            rows.sort(key=lambda row: row[sort], reverse=reverse)
+        return rows
+
+    @staticmethod
+    def export_csv(path, rows):
+        with open(path, 'w', newline='', encoding='utf-8-sig') as output:
+            writer = csv.DictWriter(output, fieldnames=list(REPORT_COLUMNS))
+            writer.writeheader()
+            writer.writerows(rows)
+
+def split_ids(value):
+    """Accept a list of IDs or a comma/whitespace separated string"""
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple, set)):
+        return [str(id).strip() for id in value if str(id).strip()]
+    return [id for id in re.split(r'[,\s;]+', str(value)) if id]
+
+def roster_cell(value):
+    """Text of a roster cell, Excel stores IDs typed as numbers as floats"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+def read_roster_rows(path):
+    """Rows of a CSV or XLSX roster as dicts keyed by the ROSTER_COLUMNS names"""
+    if path.lower().endswith('.xlsx'):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValueError("Cần cài openpyxl để đọc file Excel (pip install openpyxl)")
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = [[roster_cell(value) for value in row] for row in workbook.active.iter_rows(values_only=True)]
+        finally:
+            workbook.close()
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as source:
+            rows = [[roster_cell(value) for value in row] for row in csv.reader(source)]
+    if not rows:
+        return []
+    
+    aliases = {alias: column for column, names in ROSTER_COLUMNS.items() for alias in names}
+    header = [aliases.get(name.lower()) for name in rows[0]]
+    if 'student_id' not in header:
+        raise ValueError("Không tìm thấy cột mã học sinh (student_id)")
+    return [
+        {column: value for column, value in zip(header, row) if column}
+        for row in rows[1:]
+    ]
+
+def group_roster_rows(rows):
+    """Turn one-row-per-student roster rows into raw class definitions, in file order"""
+    lesson_types = {label.lower(): key for key, label in LESSON_TYPES.items()}
+    classes = {}
+    for row in rows:
+        name = row.get('class') or 'Lớp 1'
+        definition = classes.setdefault(name, {'name': name, 'student_ids': [], 'online_students': []})
+        lesson_type = row.get('lesson_type', '').lower()
+        if lesson_type and 'lesson_type' not in definition:
+            definition['lesson_type'] = lesson_types.get(lesson_type, lesson_type)
+        if row.get('url') and 'url' not in definition:
+            definition['url'] = row['url']
+        if row.get('student_id'):
+            definition['student_ids'].append(row['student_id'])
+            if row.get('online', '').lower() in ('1', 'x', 'y', 'yes', 'true', 'online', 'có'):
+                definition['online_students'].append(row['student_id'])
+    return list(classes.values())
+
+def read_class_file(path):
+    """Raw class definitions from a JSON, YAML, CSV or XLSX file.
+
+    JSON/YAML hold a list of classes (or {"classes": [...]}) with name, student_ids,
+    online_students, lesson_type and url. CSV/XLSX rosters have one row per student
+    with the columns class, student_id, online, lesson_type, url.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.csv', '.xlsx'):
+        return group_roster_rows(read_roster_rows(path))
+    
+    with open(path, encoding='utf-8') as source:
+        if extension in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("Cần cài PyYAML để đọc file YAML (pip install pyyaml)")
+            data = yaml.safe_load(source)
+        else:
+            data = json.load(source)
+    if isinstance(data, dict):
+        data = data.get('classes', [])
+    if not isinstance(data, list):
+        raise ValueError("File cấu hình phải chứa danh sách lớp")
+    return data
+
+def load_class_definitions(path):
+    """Read and validate a class file into worker-ready dicts, raises ValueError on bad input"""
+    definitions = []
+    names = set()
+    for index, raw in enumerate(read_class_file(path), start=1):
+        if not isinstance(raw, dict):
+            raise ValueError(f"Lớp thứ {index}: cấu hình không hợp lệ")
+        name = str(raw.get('name') or f"Lớp {index}")
+        if name in names:
+            raise ValueError(f"Tên lớp bị trùng: {name}")
+        names.add(name)
+        
+        is_valid, result = validate_student_list(split_ids(raw.get('student_ids')))
+        if not is_valid:
+            raise ValueError(f"Lỗi ở lớp {name}: {result}")
+        lesson_type = raw.get('lesson_type') or 'theory'
+        if lesson_type not in LESSON_TYPES:
+            raise ValueError(f"Lỗi ở lớp {name}: kiểu buổi học '{lesson_type}' không hợp lệ")
+        # Without a URL a headless or pooled browser never reaches this class's page
+        url = str(raw.get('url') or '').strip()
+        if not re.match(r'^https?://', url):
+            raise ValueError(f"Lỗi ở lớp {name}: thiếu url trang điểm danh của lớp")
+        
+        definitions.append({
+            'name': name,
+            'student_ids': result,
+            'online_students': set(split_ids(raw.get('online_students'))),
+            'lesson_type': lesson_type,
+            'url': url,
+        })
+    if not definitions:
+        raise ValueError("File cấu hình không có lớp nào")
+    return definitions
+
 class StudentAttendanceChecker:
     def __init__(self):
         self.class_tabs = []
         self.tab_browsers = {}  # Store browser instances for each tab
+        self.running_tabs = set()  # tabs with a job in progress, their browser must not get a second one
+        self.journal = AttendanceJournal()
+        self.profiles = ClassProfileStore()
+        self.latency = AdaptiveTimeouts()  # shared by every class and run of this session
+        self.failures = FailureLog()       # failed students of every run, shown in the report tab
+        self.last_timings = None
         self.setup_gui()
         self.root.update()
+        
+        # Import Selenium in the background now that the window is visible
+        threading.Thread(target=load_selenium, daemon=True, name='load-selenium').start()
+        
+        # Extra browsers for sharded classes, launched on the first run that shards
+        self.driver_pool = DriverPool(DRIVER_POOL_SIZE, profile=self.browser_profile())
 
     def setup_gui(self):
         self.root = tk.Tk()
@@ -234,10 +2648,70 @@ class StudentAttendanceChecker:
         process_all_btn = ttk.Button(control_panel, text="Điểm danh tất cả", command=self.process_all_classes)
         process_all_btn.pack(side=tk.LEFT, padx=5)
         
+        # Import a CSV/XLSX roster into the class tabs
+        import_btn = ttk.Button(control_panel, text="Nhập từ file", command=self.import_roster)
+        import_btn.pack(side=tk.LEFT, padx=5)
+        
+        # Saved class profiles, opened by name
+        ttk.Label(control_panel, text="Lớp đã lưu:").pack(side=tk.LEFT, padx=(15, 5))
+        self.saved_class_var = tk.StringVar()
+        saved_class_combo = ttk.Combobox(
+            control_panel, textvariable=self.saved_class_var, state="readonly", width=18,
+            postcommand=lambda: saved_class_combo.configure(values=self.profiles.names())
+        )
+        saved_class_combo.pack(side=tk.LEFT)
+        saved_class_combo.bind("<<ComboboxSelected>>", lambda e: self.open_profile(self.saved_class_var.get()))
+        
+        # Resume button skips students already recorded in the journal today
+        resume_btn = ttk.Button(control_panel, text="Tiếp tục điểm danh", command=lambda: self.process_all_classes(resume=True))
+        resume_btn.pack(side=tk.LEFT, padx=5)
+        
         # About button in top right
         about_btn = ttk.Button(control_panel, text="About", command=self.show_about)
         about_btn.pack(side=tk.RIGHT, padx=5)
         
+        # Run options panel
+        options_panel = ttk.Frame(main_container)
+        options_panel.pack(fill=tk.X, pady=(0, 10))
+        
+        # Concurrency limit for processing all classes (each class uses its own browser)
+        ttk.Label(options_panel, text="Số lớp chạy song song:").pack(side=tk.LEFT, padx=5)
+        self.max_concurrent_var = tk.IntVar(value=DEFAULT_MAX_CONCURRENT_CLASSES)
+        concurrency_spinbox = ttk.Spinbox(options_panel, from_=1, to=16, width=4, textvariable=self.max_concurrent_var)
+        concurrency_spinbox.pack(side=tk.LEFT)
+        
+        # Attendance engine selection
+        ttk.Label(options_panel, text="Chế độ:").pack(side=tk.LEFT, padx=(15, 5))
+        self.engine_var = tk.StringVar(value=ATTENDANCE_ENGINES[DEFAULT_ENGINE])
+        engine_combo = ttk.Combobox(options_panel, textvariable=self.engine_var, values=[ATTENDANCE_ENGINES[key] for key in engine_choices()], state="readonly", width=22)
+        engine_combo.pack(side=tk.LEFT)
+        
+        # Browser launch profile selection
+        ttk.Label(options_panel, text="Trình duyệt:").pack(side=tk.LEFT, padx=(15, 5))
+        self.browser_profile_var = tk.StringVar(value=BROWSER_PROFILES[DEFAULT_BROWSER_PROFILE])
+        profile_combo = ttk.Combobox(options_panel, textvariable=self.browser_profile_var, values=list(BROWSER_PROFILES.values()), state="readonly", width=20)
+        profile_combo.pack(side=tk.LEFT)
+        profile_combo.bind("<<ComboboxSelected>>", lambda e: self.driver_pool.set_profile(self.browser_profile()))
+        
+        # Run classes in threads of this window or in separate worker processes
+        ttk.Label(options_panel, text="Chạy trong:").pack(side=tk.LEFT, padx=(15, 5))
+        self.job_backend_var = tk.StringVar(value=JOB_BACKENDS[DEFAULT_JOB_BACKEND])
+        ttk.Combobox(options_panel, textvariable=self.job_backend_var, values=list(JOB_BACKENDS.values()), state="readonly", width=20).pack(side=tk.LEFT)
+        
+        # Attempts per student before it is reported as failed
+        ttk.Label(options_panel, text="Số lần thử:").pack(side=tk.LEFT, padx=(15, 5))
+        self.retry_attempts_var = tk.IntVar(value=DEFAULT_RETRY_ATTEMPTS)
+        ttk.Spinbox(options_panel, from_=1, to=5, width=3, textvariable=self.retry_attempts_var).pack(side=tk.LEFT)
+        
+        # Browsers per class, a large class is split between them
+        ttk.Label(options_panel, text="Trình duyệt/lớp:").pack(side=tk.LEFT, padx=(15, 5))
+        self.shards_var = tk.IntVar(value=DEFAULT_SHARDS)
+        ttk.Spinbox(options_panel, from_=1, to=MAX_SHARDS, width=3, textvariable=self.shards_var).pack(side=tk.LEFT)
+        
+        # Diff mode: read the row first and only write cells that differ
+        self.skip_correct_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_panel, text="Bỏ qua ô đã đúng", variable=self.skip_correct_var).pack(side=tk.LEFT, padx=(15, 5))
+        
         # Notebook for tabs
         self.notebook = ttk.Notebook(main_container)
         self.notebook.pack(fill=tk.BOTH, expand=True)
@@ -247,11 +2721,94 @@ class StudentAttendanceChecker:
         self.notebook.add(self.report_frame, text="Báo cáo lỗi")
         self.setup_report_tab()
         
-        # Add first class tab
-        self.add_class_tab()
+        # Tab widgets are built the first time a tab is shown
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        
+        # Reopen the classes from the last session, or start with one empty tab
+        self.restore_session()
         
         self.root.after(2000, lambda: self.root.attributes('-topmost', False))
 
+    def browser_profile(self):
+        return next((key for key, label in BROWSER_PROFILES.items() if label == self.browser_profile_var.get()), DEFAULT_BROWSER_PROFILE)
+
+    def job_backend(self):
+        return next((key for key, label in JOB_BACKENDS.items() if label == self.job_backend_var.get()), DEFAULT_JOB_BACKEND)
+
+    def create_runner(self, max_workers):
+        """Job runner for the selected backend, with the control its workers share"""
+        if self.job_backend() == 'process':
+            control = JobControl(process_context())
+            return ProcessJobRunner(max_workers=max_workers, control=control), control
+        control = JobControl()
+        return AttendanceJobRunner(max_workers=max_workers, control=control), control
+
+    def tab_class_url(self, tab_id):
+        """Attendance page the tab's browser is showing, None without a live browser on one"""
+        driver = self.tab_browsers.get(tab_id)
+        if driver is None or not is_browser_alive(driver):
+            return None
+        try:
+            url = driver.current_url
+        except Exception:
+            return None
+        return url if "class-attendances" in url else None
+
+    def require_class_urls(self, tab_ids):
+        """The process backend reopens the class page in a fresh browser, so every tab needs one open"""
+        if self.job_backend() != 'process':
+            return True
+        missing = [str(tab_id) for tab_id in tab_ids if not self.tab_class_url(tab_id)]
+        if missing:
+            messagebox.showerror("Lỗi", f"Lớp {', '.join(missing)} chưa mở trang điểm danh. "
+                                 "Hãy mở trình duyệt và vào trang điểm danh của lớp trước khi chạy trong tiến trình riêng!")
+            return False
+        return True
+
+    def release_tab_browser(self, tab_id):
+        """Close a tab's browser so a worker process can open the same profile.
+        Returns the class page it was showing for the worker to open again"""
+        class_url = self.tab_class_url(tab_id)
+        driver = self.tab_browsers.pop(tab_id, None)
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+            logging.info(f"Closed browser of tab {tab_id}, the worker process reopens {class_url}")
+        return class_url
+
+    def tab_name(self, tab):
+        return tab.get('name', f"Lớp {tab['id']}")
+
+    def worker_options(self, tab_id):
+        """Keyword arguments for ClassAttendanceWorker taken from the run options panel"""
+        engine = next((key for key, label in ATTENDANCE_ENGINES.items() if label == self.engine_var.get()), DEFAULT_ENGINE)
+        try:
+            retry_attempts = max(1, int(self.retry_attempts_var.get()))
+        except (tk.TclError, ValueError):
+            retry_attempts = DEFAULT_RETRY_ATTEMPTS
+        try:
+            shards = min(MAX_SHARDS, max(1, int(self.shards_var.get())))
+        except (tk.TclError, ValueError):
+            shards = DEFAULT_SHARDS
+        # Shards copy the session into pooled browsers, unsharded tabs and worker processes
+        # keep their own browser
+        pooled = shards > 1 and self.job_backend() != 'process'
+        if pooled:
+            self.driver_pool.start()
+        return {
+            'engine': engine,
+            'browser_profile': self.browser_profile(),
+            'user_data_dir': profile_dir(f"tab_{tab_id}"),
+            'driver_pool': self.driver_pool if pooled else None,
+            'journal': self.journal,
+            'skip_correct': self.skip_correct_var.get(),
+            'retry_attempts': retry_attempts,
+            'latency': self.latency,
+            'shards': shards,
+        }
+
     def show_about(self):
         about_text = """BGO Auto Tool
 Version 1.0
@@ -262,8 +2819,9 @@ GitHub: https://github.com/MRXz194
 © 2025 All Rights Reserved"""
         messagebox.showinfo("About", about_text)
 
-    def create_class_tab(self, tab_id):
-        class_frame = ttk.Frame(self.notebook, padding="10")
+    def create_class_tab(self, tab_id, class_frame=None, roster=None):
+        if class_frame is None:
+            class_frame = ttk.Frame(self.notebook, padding="10")
         
         # Top control bar for the tab
         tab_control = ttk.Frame(class_frame)
@@ -371,26 +2929,59 @@ GitHub: https://github.com/MRXz194
         ttk.Label(stats_frame, textvariable=digits_4_count_var, font=('Arial', 10)).pack(anchor=tk.W, pady=2)
         ttk.Label(stats_frame, textvariable=digits_other_count_var, font=('Arial', 10)).pack(anchor=tk.W, pady=2)
         
-        # Function to update statistics
+        # Function to update statistics from the roster's running counts
         def update_stats():
-            all_ids = list(id_listbox.get(0, tk.END))
-            total = len(all_ids)
-            
-            # Count by length
-            digits_3 = sum(1 for id in all_ids if len(id) == 3)
-            digits_4 = sum(1 for id in all_ids if len(id) == 4)
-            digits_other = total - digits_3 - digits_4
-            
-            # Update variables
-            total_count_var.set(f"Tổng số ID: {total}")
-            digits_3_count_var.set(f"ID 3 chữ số: {digits_3}")
-            digits_4_count_var.set(f"ID 4 chữ số: {digits_4}")
-            digits_other_count_var.set(f"ID khác: {digits_other}")
+            total_count_var.set(f"Tổng số ID: {roster.counts['total']}")
+            digits_3_count_var.set(f"ID 3 chữ số: {roster.counts['digits_3']}")
+            digits_4_count_var.set(f"ID 4 chữ số: {roster.counts['digits_4']}")
+            digits_other_count_var.set(f"ID khác: {roster.counts['other']}")
+        
+        # Keep the listbox and statistics in step with the roster
+        def on_roster_change(event, ids):
+            if event == 'add':
+                id_listbox.insert(tk.END, *ids)
+            elif event == 'remove':
+                positions = {id: index for index, id in enumerate(id_listbox.get(0, tk.END))}
+                for id in ids:
+                    if id in positions:
+                        id_listbox.delete(positions[id])
+            else:
+                id_listbox.delete(0, tk.END)
+            update_stats()
+        
+        roster = roster if roster is not None else ClassRoster()
+        if len(roster):
+            id_listbox.insert(tk.END, *roster.ids)
+        update_stats()
+        roster.subscribe(on_roster_change)
         
         # Buttons for ID management
         button_frame = ttk.Frame(all_students_frame)
         button_frame.pack(fill=tk.X, pady=10)
         
+        # Validate, de-duplicate and add many IDs at once, returns the roster's result
+        def add_ids(ids, verb="Đã thêm", show_details=True):
+            result = roster.add_many(ids)
+            
+            # Show report on what happened
+            msg = []
+            if result['added']:
+                msg.append(f"{verb} {len(result['added'])} ID")
+            if result['invalid']:
+                msg.append(f"{len(result['invalid'])} ID không hợp lệ")
+            if result['duplicates']:
+                msg.append(f"{len(result['duplicates'])} ID trùng lặp")
+            if result['semantic_duplicates']:
+                msg.append(f"{len(result['semantic_duplicates'])} ID trùng lặp (khác số 0)")
+                
+                # Show detailed message about semantic duplicates
+                if show_details and len(result['semantic_duplicates']) <= 3:  # Only show details for a few duplicates
+                    detail_msg = "Trùng lặp: " + ", ".join(result['semantic_duplicates'])
+                    messagebox.showinfo("ID trùng lặp (khác số 0)", detail_msg)
+            
+            id_status_var.set(" - ".join(msg))
+            return result
+        
         # Function to add an ID
         def add_id():
             input_text = student_id_var.get().strip()
@@ -400,95 +2991,22 @@ GitHub: https://github.com/MRXz194
                 
             # Check if the input contains commas - multiple IDs
             if ',' in input_text:
-                ids = [id.strip() for id in input_text.split(',') if id.strip()]
-                
-                # Validate and process each ID
-                valid_ids = []
-                invalid_ids = []
-                duplicate_ids = []
-                semantic_duplicates = []
-                
-                current_ids = list(id_listbox.get(0, tk.END))
-                normalized_current_ids = {self.normalize_student_id(id): id for id in current_ids}
-                
-                for student_id in ids:
-                    is_valid, error_msg = self.validate_student_id(student_id)
-                    if not is_valid:
-                        invalid_ids.append(student_id)
-                        continue
-                    
-                    # Check for exact duplicates
-                    if student_id in current_ids:
-                        duplicate_ids.append(student_id)
-                        continue
-                    
-                    # Check for semantic duplicates (same ID with different zeros)
-                    normalized_id = self.normalize_student_id(student_id)
-                    if normalized_id in normalized_current_ids and student_id != normalized_current_ids[normalized_id]:
-                        semantic_duplicates.append(f"{student_id} (trùng với {normalized_current_ids[normalized_id]})")
-                        continue
-                    
-                    valid_ids.append(student_id)
-                    # Add to tracking collections
-                    current_ids.append(student_id)
-                    normalized_current_ids[normalized_id] = student_id
-                
-                # Add to listbox
-                for id in valid_ids:
-                    id_listbox.insert(tk.END, id)
-                
-                # Update statistics
-                update_stats()
-                
-                # Show report on what happened
-                msg = []
-                if valid_ids:
-                    msg.append(f"Đã thêm {len(valid_ids)} ID")
-                if invalid_ids:
-                    msg.append(f"{len(invalid_ids)} ID không hợp lệ")
-                if duplicate_ids:
-                    msg.append(f"{len(duplicate_ids)} ID trùng lặp")
-                if semantic_duplicates:
-                    msg.append(f"{len(semantic_duplicates)} ID trùng lặp (khác số 0)")
-                    
-                    # Show detailed message about semantic duplicates
-                    if len(semantic_duplicates) <= 3:  # Only show details for a few duplicates
-                        detail_msg = "Trùng lặp: " + ", ".join(semantic_duplicates)
-                        messagebox.showinfo("ID trùng lặp (khác số 0)", detail_msg)
-                
-                id_status_var.set(" - ".join(msg))
+                add_ids(input_text.split(','))
                 student_id_var.set("")  # Clear entry
                 student_id_entry.focus()  # Keep focus on entry field
                 return
                 
             # Single ID processing
-            student_id = input_text
-            is_valid, error_msg = self.validate_student_id(student_id)
-            if not is_valid:
+            error_msg = roster.check(input_text)
+            if error_msg:
                 id_status_var.set(error_msg)
                 return
                 
-            # Check if ID already exists in the list (exact match)
-            current_ids = list(id_listbox.get(0, tk.END))
-            if student_id in current_ids:
-                id_status_var.set("ID này đã tồn tại trong danh sách!")
-                return
-            
-            # Check for semantic duplicates (same number with different leading zeros)
-            normalized_id = self.normalize_student_id(student_id)
-            for existing_id in current_ids:
-                if self.normalize_student_id(existing_id) == normalized_id:
-                    id_status_var.set(f"ID này đã tồn tại với dạng {existing_id}!")
-                    return
-                
-            id_listbox.insert(tk.END, student_id)
+            roster.add_many([input_text])
             student_id_var.set("")  # Clear entry
-            id_status_var.set("Đã thêm 1 ID")  # Clear error message
+            id_status_var.set("Đã thêm 1 ID")
             student_id_entry.focus()  # Keep focus on entry field for fast input
             
-            # Update statistics
-            update_stats()
-            
         # Function to remove selected ID
         def remove_id():
             selected = id_listbox.curselection()
@@ -496,13 +3014,10 @@ GitHub: https://github.com/MRXz194
                 id_status_var.set("Vui lòng chọn ID để xóa")
                 return
                 
-            id_listbox.delete(selected)
+            roster.remove(id_listbox.get(selected[0]))
             id_status_var.set("")
             student_id_entry.focus()  # Return focus to entry field
             
-            # Update statistics
-            update_stats()
-            
         # Add ID button
         add_btn = ttk.Button(button_frame, text="Thêm ID", command=add_id, width=15)
         add_btn.pack(side=tk.LEFT, padx=5)
@@ -513,100 +3028,18 @@ GitHub: https://github.com/MRXz194
         
         # Clear all button
         def clear_all():
-            id_listbox.delete(0, tk.END)
+            roster.clear()
             id_status_var.set("")
             student_id_entry.focus()
             
-            # Update statistics
-            update_stats()
-            
         clear_btn = ttk.Button(button_frame, text="Xóa tất cả", command=clear_all, width=15)
         clear_btn.pack(side=tk.LEFT, padx=5)
         
-        # Create a hidden entry field to store the comma-separated list for compatibility
-        student_ids_entry = ttk.Entry(all_students_frame)
-        student_ids_entry.pack_forget()  # Hide this widget
-        
-        # Update the hidden entry when needed for compatibility with existing code
-        def update_hidden_entry():
-            all_ids = list(id_listbox.get(0, tk.END))
-            student_ids_entry.delete(0, tk.END)
-            student_ids_entry.insert(0, ",".join(all_ids))
-            
-        # Bind events to update hidden entry
-        id_listbox.bind('<<ListboxSelect>>', lambda e: update_hidden_entry())
-        
-        # Override the process_single_class to update the hidden entry first
-        original_process = self.process_single_class
-        def wrapped_process(tab_id):
-            update_hidden_entry()
-            original_process(tab_id)
-        self.process_single_class = wrapped_process
-        
         # Load existing IDs if available (paste them to the listbox)
         def load_ids_from_clipboard():
             try:
                 clipboard = self.root.clipboard_get()
-                ids = [id.strip() for id in clipboard.split(',') if id.strip()]
-                
-                # Validate each ID
-                valid_ids = []
-                invalid_ids = []
-                duplicate_ids = []
-                semantic_duplicates = []
-                
-                current_ids = list(id_listbox.get(0, tk.END))
-                normalized_current_ids = {self.normalize_student_id(id): id for id in current_ids}
-                
-                for student_id in ids:
-                    is_valid, _ = self.validate_student_id(student_id)
-                    if not is_valid:
-                        invalid_ids.append(student_id)
-                        continue
-                    
-                    # Check for exact duplicates
-                    if student_id in current_ids:
-                        duplicate_ids.append(student_id)
-                        continue
-                    
-                    # Check for semantic duplicates (same ID with different zeros)
-                    normalized_id = self.normalize_student_id(student_id)
-                    if normalized_id in normalized_current_ids and student_id != normalized_current_ids[normalized_id]:
-                        semantic_duplicates.append(f"{student_id} (trùng với {normalized_current_ids[normalized_id]})")
-                        continue
-                    
-                    valid_ids.append(student_id)
-                    # Add to tracking collections
-                    current_ids.append(student_id)
-                    normalized_current_ids[normalized_id] = student_id
-                
-                # Add to listbox
-                for id in valid_ids:
-                    id_listbox.insert(tk.END, id)
-                
-                # Update hidden entry
-                update_hidden_entry()
-                
-                # Update statistics
-                update_stats()
-                
-                # Show report on what happened
-                msg = []
-                if valid_ids:
-                    msg.append(f"Đã nạp {len(valid_ids)} ID")
-                if invalid_ids:
-                    msg.append(f"{len(invalid_ids)} ID không hợp lệ")
-                if duplicate_ids:
-                    msg.append(f"{len(duplicate_ids)} ID trùng lặp")
-                if semantic_duplicates:
-                    msg.append(f"{len(semantic_duplicates)} ID trùng lặp (khác số 0)")
-                    
-                    # Show detailed message about semantic duplicates
-                    if len(semantic_duplicates) <= 3:  # Only show details for a few duplicates
-                        detail_msg = "Trùng lặp: " + ", ".join(semantic_duplicates)
-                        messagebox.showinfo("ID trùng lặp (khác số 0)", detail_msg)
-                
-                id_status_var.set(" - ".join(msg))
+                add_ids(clipboard.split(','), verb="Đã nạp")
                 student_id_entry.focus()
             except Exception as e:
                 id_status_var.set("Không thể nạp từ clipboard")
@@ -624,25 +3057,152 @@ GitHub: https://github.com/MRXz194
             'frame': class_frame,
             'lesson_type': lesson_type,
             'online_ids_entry': online_ids_entry,
-            'student_ids_entry': student_ids_entry,
+            'roster': roster,
             'id_listbox': id_listbox,
+            'add_ids': add_ids,
             'status_label': status_label
         }
 
-    def add_class_tab(self):
+    def add_class_tab(self, name=None, profile=None, select=True):
+        """Add a class tab, its widgets are only built once the tab is shown"""
         tab_id = len(self.class_tabs) + 1
-        tab_info = self.create_class_tab(tab_id)
+        name = name or f"Lớp {tab_id}"
+        profile = profile or {}
+        tab_info = {
+            'id': tab_id,
+            'frame': ttk.Frame(self.notebook, padding="10"),
+            'name': name,
+            'roster': ClassRoster(profile.get('student_ids', ())),
+            'pending': profile,
+        }
         
-        # Insert before report tab with default name
-        self.notebook.insert(self.notebook.index(self.report_frame), tab_info['frame'], text=f"Lớp {tab_id}")
+        # Insert before report tab
+        self.notebook.insert(self.notebook.index(self.report_frame), tab_info['frame'], text=name)
+        self.class_tabs.append(tab_info)
         
-        # Store the tab name in the tab_info dictionary for later reference
-        tab_info['name'] = f"Lớp {tab_id}"
+        if select:
+            self.notebook.select(tab_info['frame'])
+            self.ensure_tab_built(tab_info)
+        return tab_info
+
+    def ensure_tab_built(self, tab):
+        """Create the widgets of a tab that has not been shown yet and fill in its profile"""
+        if 'pending' not in tab:
+            return tab
+        profile = tab.pop('pending')
+        tab.update(self.create_class_tab(tab['id'], tab['frame'], tab['roster']))
+        if profile.get('online_students'):
+            tab['online_ids_entry'].insert(0, ",".join(profile['online_students']))
+        if profile.get('lesson_type') in LESSON_TYPES:
+            tab['lesson_type'].set(profile['lesson_type'])
+        return tab
+
+    def on_tab_changed(self, event=None):
+        selected = self.notebook.select()
+        tab = next((tab for tab in self.class_tabs if str(tab['frame']) == selected), None)
+        if tab:
+            self.ensure_tab_built(tab)
+
+    def tab_state(self, tab):
+        """Roster, online list and lesson type of a tab, without building it"""
+        if 'pending' in tab:
+            return {
+                'student_ids': tab['roster'].ids,
+                'online_students': list(tab['pending'].get('online_students', [])),
+                'lesson_type': tab['pending'].get('lesson_type', 'theory'),
+            }
+        return {
+            'student_ids': tab['roster'].ids,
+            'online_students': split_ids(tab['online_ids_entry'].get()),
+            'lesson_type': tab['lesson_type'].get(),
+        }
+
+    def open_profile(self, name):
+        """Switch to the tab of a saved class, opening it from the store if needed"""
+        tab = next((tab for tab in self.class_tabs if self.tab_name(tab) == name), None)
+        if tab:
+            self.notebook.select(tab['frame'])
+            self.ensure_tab_built(tab)
+        elif self.profiles.get(name) is not None:
+            self.add_class_tab(name, self.profiles.get(name))
+
+    def restore_session(self):
+        for name in self.profiles.session:
+            self.add_class_tab(name, self.profiles.get(name), select=False)
+        if self.class_tabs:
+            self.notebook.select(self.class_tabs[0]['frame'])
+            self.ensure_tab_built(self.class_tabs[0])
+        else:
+            self.add_class_tab()
+
+    def save_profiles(self):
+        """Store every non-empty tab as a class profile and remember the open tabs"""
+        session = []
+        for tab in self.class_tabs:
+            state = self.tab_state(tab)
+            if not state['student_ids']:
+                continue
+            name = self.tab_name(tab)
+            self.profiles.save(name, state['student_ids'], state['online_students'], state['lesson_type'])
+            session.append(name)
+        self.profiles.session = session
+        try:
+            self.profiles.flush()
+        except OSError as e:
+            logging.error(f"Failed to save class profiles: {str(e)}")
+
+    def import_roster(self):
+        """Fill class tabs from a CSV/XLSX roster, one summary instead of a message per ID"""
+        path = filedialog.askopenfilename(
+            title="Nhập danh sách học sinh",
+            filetypes=[("Danh sách lớp", "*.csv *.xlsx"), ("CSV", "*.csv"), ("Excel", "*.xlsx")]
+        )
+        if not path:
+            return
+        try:
+            classes = read_class_file(path)
+        except (OSError, ValueError, csv.Error) as e:
+            messagebox.showerror("Lỗi", f"Không thể đọc file: {str(e)}")
+            return
+        if not classes:
+            messagebox.showwarning("Cảnh báo", "File không có học sinh nào!")
+            return
         
-        self.class_tabs.append(tab_info)
+        # Empty tabs that still have their default name are filled before adding new ones
+        empty_tabs = [
+            tab for tab in self.class_tabs
+            if not self.tab_state(tab)['student_ids'] and self.tab_name(tab).startswith('Lớp ')
+        ]
+        summary = []
+        for definition in classes:
+            tab = next((tab for tab in self.class_tabs if self.tab_name(tab) == definition['name']), None)
+            if tab is None:
+                tab = empty_tabs.pop(0) if empty_tabs else self.add_class_tab()
+                tab['name'] = definition['name']
+                self.notebook.tab(self.notebook.index(tab['frame']), text=definition['name'])
+            elif tab in empty_tabs:
+                empty_tabs.remove(tab)
+            self.ensure_tab_built(tab)
+            
+            result = tab['add_ids'](definition['student_ids'], verb="Đã nhập", show_details=False)
+            
+            # Keep online IDs already typed in, append the new ones
+            online_ids = split_ids(tab['online_ids_entry'].get())
+            online_ids += [id for id in definition['online_students'] if id not in online_ids]
+            tab['online_ids_entry'].delete(0, tk.END)
+            tab['online_ids_entry'].insert(0, ",".join(online_ids))
+            
+            if definition.get('lesson_type') in LESSON_TYPES:
+                tab['lesson_type'].set(definition['lesson_type'])
+            
+            line = f"{definition['name']}: thêm {len(result['added'])} ID"
+            dropped = len(result['invalid']) + len(result['duplicates']) + len(result['semantic_duplicates'])
+            if dropped:
+                line += f", bỏ qua {dropped} ID (không hợp lệ: {len(result['invalid'])}, trùng lặp: {len(result['duplicates']) + len(result['semantic_duplicates'])})"
+            summary.append(line)
         
-        # Select the new tab
-        self.notebook.select(tab_info['frame'])
+        logging.info(f"Imported roster {path}: {len(classes)} classes")
+        messagebox.showinfo("Nhập danh sách", "\n".join(summary))
 
     def delete_class_tab(self, tab_id):
         # Close browser if it exists
@@ -678,118 +3238,192 @@ GitHub: https://github.com/MRXz194
             # If it's a custom name, we keep it as is
 
     def setup_report_tab(self):
-        report_container = ttk.Frame(self.report_frame)
-        report_container.pack(fill=tk.BOTH, expand=True)
+        report_controls = ttk.Frame(self.report_frame)
+        report_controls.pack(fill=tk.X, pady=(0, 5))
+        
+        # Filters on class and error type, refreshed from the history when opened
+        ttk.Label(report_controls, text="Lớp:").pack(side=tk.LEFT, padx=(5, 5))
+        self.report_class_var = tk.StringVar(value="Tất cả")
+        class_filter = ttk.Combobox(
+            report_controls, textvariable=self.report_class_var, state="readonly", width=18,
+            postcommand=lambda: class_filter.configure(values=["Tất cả"] + self.failures.values('class'))
+        )
+        class_filter.pack(side=tk.LEFT)
+        class_filter.bind("<<ComboboxSelected>>", lambda e: self.refresh_report_table())
+        
+        ttk.Label(report_controls, text="Loại lỗi:").pack(side=tk.LEFT, padx=(15, 5))
+        self.report_type_var = tk.StringVar(value="Tất cả")
+        type_filter = ttk.Combobox(
+            report_controls, textvariable=self.report_type_var, state="readonly", width=18,
+            postcommand=lambda: type_filter.configure(values=["Tất cả"] + self.failures.values('error_type'))
+        )
+        type_filter.pack(side=tk.LEFT)
+        type_filter.bind("<<ComboboxSelected>>", lambda e: self.refresh_report_table())
+        
+        export_report_btn = ttk.Button(report_controls, text="Xuất CSV", command=self.export_report)
+        export_report_btn.pack(side=tk.LEFT, padx=(15, 5))
         
-        self.report_text = tk.Text(report_container, height=15, width=60)
-        scrollbar = ttk.Scrollbar(report_container, orient="vertical", command=self.report_text.yview)
-        self.report_text.configure(yscrollcommand=scrollbar.set)
+        clear_report_btn = ttk.Button(report_controls, text="Xóa lịch sử", command=self.failures.clear)
+        clear_report_btn.pack(side=tk.LEFT, padx=5)
+        
+        export_timings_btn = ttk.Button(report_controls, text="Xuất thời gian xử lý", command=self.export_timings)
+        export_timings_btn.pack(side=tk.LEFT, padx=5)
+        
+        self.report_count_label = ttk.Label(report_controls, text="")
+        self.report_count_label.pack(side=tk.RIGHT, padx=5)
+        
+        # Summary of the last run: skipped and unprocessed students, phase timings
+        summary_container = ttk.Frame(self.report_frame)
+        summary_container.pack(fill=tk.X, pady=(0, 5))
+        
+        self.report_text = tk.Text(summary_container, height=6, width=60)
+        summary_scrollbar = ttk.Scrollbar(summary_container, orient="vertical", command=self.report_text.yview)
+        self.report_text.configure(yscrollcommand=summary_scrollbar.set)
         
         self.report_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        summary_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
         self.report_text.config(state=tk.DISABLED)
+        
+        # Failed students of every run, one row each, appended as they arrive
+        table_container = ttk.Frame(self.report_frame)
+        table_container.pack(fill=tk.BOTH, expand=True)
+        
+        self.report_table = ttk.Treeview(table_container, columns=list(REPORT_COLUMNS), show="headings")
+        for column, (heading, width) in REPORT_COLUMNS.items():
+            self.report_table.heading(column, text=heading, command=lambda column=column: self.sort_report(column))
+            self.report_table.column(column, width=width, stretch=column == 'error')
+        table_scrollbar = ttk.Scrollbar(table_container, orient="vertical", command=self.report_table.yview)
+        self.report_table.configure(yscrollcommand=table_scrollbar.set)
+        
+        self.report_table.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        table_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        self.report_sort = (None, False)
+        self.report_refresh = 0  # bumped to stop an unfinished redraw
+        self.report_shown = 0
+        self.failures.subscribe(self.on_failures_change)
+        self.update_report_count()
 
-    def normalize_student_id(self, student_id):
-        """Normalize student ID by stripping leading zeros"""
-        return student_id.lstrip('0') or '0'  # Return '0' if ID is all zeros
-    
-    def validate_student_id(self, student_id):
-        student_id = student_id.strip()
-        if not student_id.isdigit():
-            return False, "Mã học sinh chỉ được chứa số"
-        if len(student_id) < 2 or len(student_id) > 6:
-            return False, "Độ dài mã học sinh không hợp lệ"
-        return True, ""
-
-    def check_for_duplicates(self, id_list):
-        seen = set()
-        duplicates = []
-        normalized_ids = {}
-        
-        # First pass: build a mapping of normalized IDs to original IDs
-        for id in id_list:
-            normalized = self.normalize_student_id(id)
-            if normalized in normalized_ids:
-                # Already seen this normalized ID
-                normalized_ids[normalized].append(id)
-            else:
-                normalized_ids[normalized] = [id]
+    def report_filter(self):
+        """(class, error type) selected in the report filters, None for all"""
+        class_name = self.report_class_var.get()
+        kind = self.report_type_var.get()
+        return (None if class_name == "Tất cả" else class_name), (None if kind == "Tất cả" else kind)
+
+    def report_row(self, row):
+        return [row[column] for column in REPORT_COLUMNS]
+
+    def on_failures_change(self, event, rows):
+        if event == 'clear':
+            self.refresh_report_table()
+            return
+        # New rows go to the end, sorting again puts them in place
+        class_name, kind = self.report_filter()
+        for row in rows:
+            if (not class_name or row['class'] == class_name) and (not kind or row['error_type'] == kind):
+                self.report_table.insert("", tk.END, values=self.report_row(row))
+                self.report_shown += 1
+        self.update_report_count()
+
+    def update_report_count(self):
+        self.report_count_label.config(text=f"Hiển thị {self.report_shown}/{len(self.failures.rows)} lỗi")
+
+    def sort_report(self, column):
+        sort, reverse = self.report_sort
+        self.report_sort = (column, not reverse if sort == column else False)
+        self.refresh_report_table()
+
+    def refresh_report_table(self):
+        """Redraw the table for the current filter and sort, in slices so Tk stays responsive"""
+        self.report_refresh += 1
+        refresh = self.report_refresh
+        self.report_table.delete(*self.report_table.get_children())
+        self.report_shown = 0
+        class_name, kind = self.report_filter()
+        sort, reverse = self.report_sort
+        rows = self.failures.select(class_name, kind, sort, reverse)
         
-        # Second pass: find duplicates
-        for normalized, ids in normalized_ids.items():
-            if len(ids) > 1:
-                # If we have multiple IDs with the same normalized form
-                duplicates.extend(ids)
+        def insert_batch(start):
+            if refresh != self.report_refresh:
+                return
+            batch = rows[start:start + REPORT_INSERT_BATCH]
+            for row in batch:
+                self.report_table.insert("", tk.END, values=self.report_row(row))
+            self.report_shown += len(batch)
+            self.update_report_count()
+            if start + len(batch) < len(rows):
+                self.root.after_idle(insert_batch, start + len(batch))
         
-        return duplicates
+        insert_batch(0)
 
-    def validate_class_input(self, student_ids):
-        if not student_ids:
-            return False, "Vui lòng nhập ít nhất một mã học sinh"
-            
-        student_list = []
-        for student_id in student_ids.split(','):
-            student_id = student_id.strip()
-            is_valid, error_msg = self.validate_student_id(student_id)
-            if not is_valid:
-                return False, f"Mã học sinh không hợp lệ '{student_id}': {error_msg}"
-            student_list.append(student_id)
+    def export_report(self):
+        class_name, kind = self.report_filter()
+        sort, reverse = self.report_sort
+        rows = self.failures.select(class_name, kind, sort, reverse)
+        if not rows:
+            messagebox.showinfo("Thông báo", "Không có lỗi nào để xuất!")
+            return
         
-        # Check for duplicates (both exact and semantic)
-        exact_duplicates = self.check_for_duplicates(student_list)
-        if exact_duplicates:
-            return False, f"Có ID trùng lặp: {', '.join(exact_duplicates)}"
-            
-        # Check for semantic duplicates
-        normalized_ids = {}
-        semantic_duplicates = []
-        
-        for id in student_list:
-            normalized = self.normalize_student_id(id)
-            if normalized in normalized_ids:
-                # This is a semantic duplicate
-                existing_id = normalized_ids[normalized]
-                semantic_duplicates.append(f"{id} (trùng với {existing_id})")
+        path = filedialog.asksaveasfilename(
+            title="Xuất báo cáo lỗi",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv")]
+        )
+        if not path:
+            return
+        try:
+            FailureLog.export_csv(path, rows)
+            messagebox.showinfo("Thông báo", f"Đã xuất {len(rows)} lỗi ra {path}")
+        except OSError as e:
+            messagebox.showerror("Lỗi", f"Không thể ghi file: {str(e)}")
+
+    def add_job_controls(self, parent, control, add_log):
+        """Pause/resume and stop buttons for a running job"""
+        frame = ttk.Frame(parent)
+        frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+        
+        def toggle_pause():
+            if control.paused:
+                control.resume()
+                pause_btn.config(text="Tạm dừng")
+                add_log("Tiếp tục điểm danh")
             else:
-                normalized_ids[normalized] = id
-                
-        if semantic_duplicates:
-            return False, f"Có ID trùng lặp (khác số 0): {', '.join(semantic_duplicates)}"
-            
-        return True, student_list
+                control.pause()
+                pause_btn.config(text="Tiếp tục")
+                add_log("Tạm dừng sau học sinh đang xử lý...")
+        
+        def stop():
+            if not messagebox.askyesno("Dừng điểm danh", "Dừng sau học sinh đang xử lý?", parent=parent):
+                return
+            control.cancel()
+            pause_btn.config(state=tk.DISABLED)
+            stop_btn.config(state=tk.DISABLED)
+            add_log("Đang dừng sau học sinh đang xử lý...")
+        
+        pause_btn = ttk.Button(frame, text="Tạm dừng", command=toggle_pause, width=12)
+        pause_btn.pack(side=tk.LEFT, padx=5)
+        stop_btn = ttk.Button(frame, text="Dừng", command=stop, width=12)
+        stop_btn.pack(side=tk.LEFT, padx=5)
+        return frame
 
-    def process_all_classes(self):
+    def process_all_classes(self, resume=False):
         if not self.class_tabs:
             messagebox.showwarning("Cảnh báo", "Không có lớp nào để điểm danh!")
             return
             
-        # First update all hidden entries from listboxes
-        for tab in self.class_tabs:
-            all_ids = list(tab['id_listbox'].get(0, tk.END))
-            tab['student_ids_entry'].delete(0, tk.END)
-            tab['student_ids_entry'].insert(0, ",".join(all_ids))
-            
         all_failed_students = []
         
+        busy = [str(tab['id']) for tab in self.class_tabs if tab['id'] in self.running_tabs]
+        if busy:
+            messagebox.showwarning("Cảnh báo", f"Lớp {', '.join(busy)} đang được điểm danh, hãy đợi chạy xong!")
+            return
+        
         # Validate all inputs first
         class_configs = []
         for tab in self.class_tabs:
-            student_ids = tab['student_ids_entry'].get().strip()
-            
-            # Check if the student_ids is empty but the listbox has values
-            if not student_ids and tab['id_listbox'].size() > 0:
-                all_ids = list(tab['id_listbox'].get(0, tk.END))
-                student_ids = ",".join(all_ids)
-                tab['student_ids_entry'].delete(0, tk.END)
-                tab['student_ids_entry'].insert(0, student_ids)
-                
-            # Double check if it's still empty
-            if not student_ids:
-                messagebox.showerror("Lỗi", f"Lỗi ở lớp {tab['id']}: Vui lòng nhập ít nhất một mã học sinh")
-                return
-                
-            is_valid, result = self.validate_class_input(student_ids)
+            self.ensure_tab_built(tab)
+            is_valid, result = validate_student_list(tab['roster'].ids)
             if not is_valid:
                 messagebox.showerror("Lỗi", f"Lỗi ở lớp {tab['id']}: {result}")
                 return
@@ -800,11 +3434,8 @@ GitHub: https://github.com/MRXz194
             # Get existing browser if available
             browser = None
             if tab['id'] in self.tab_browsers:
-                try:
-                    browser = self.tab_browsers[tab['id']]
-                    # Check if browser is still responsive
-                    browser.current_url
-                except:
+                browser = self.tab_browsers[tab['id']]
+                if not is_browser_alive(browser):
                     # Browser was closed by user
                     self.tab_browsers.pop(tab['id'])
                     browser = None
@@ -815,13 +3446,31 @@ GitHub: https://github.com/MRXz194
                 'lesson_type': tab['lesson_type'].get(),
                 'status_label': tab['status_label'],
                 'browser': browser,
-                'tab_id': tab['id']
+                'tab_id': tab['id'],
+                'class_name': self.tab_name(tab),
+                'resumed': 0
             })
         
+        if not self.require_class_urls([config['tab_id'] for config in class_configs]):
+            return
+        
+        if resume:
+            # Skip students already marked today for the same class and lesson type
+            for config in class_configs:
+                remaining = self.journal.remaining(config['class_name'], config['lesson_type'], config['student_ids'])
+                config['resumed'] = len(config['student_ids']) - len(remaining)
+                config['student_ids'] = remaining
+                if not remaining:
+                    config['status_label'].config(text="Đã điểm danh xong trước đó")
+            class_configs = [config for config in class_configs if config['student_ids']]
+            if not class_configs:
+                messagebox.showinfo("Thông báo", "Tất cả học sinh đã được điểm danh trước đó!")
+                return
+        
         # Create a progress window
         progress_window = tk.Toplevel(self.root)
         progress_window.title("Tiến trình điểm danh")
-        progress_window.geometry("400x300")
+        progress_window.geometry(f"400x{340 + 45 * min(len(class_configs), 8)}")
         progress_window.transient(self.root)
         progress_window.resizable(False, False)
         
@@ -835,18 +3484,20 @@ GitHub: https://github.com/MRXz194
         overall_progress = ttk.Progressbar(overall_frame, orient=tk.HORIZONTAL, length=350, mode='determinate')
         overall_progress.pack(fill=tk.X, pady=5)
         
-        # Current class progress frame
-        class_frame = ttk.LabelFrame(progress_window, text="Lớp đang xử lý", padding=10)
+        # Per-class progress rows, classes may run at the same time
+        class_frame = ttk.LabelFrame(progress_window, text="Các lớp đang xử lý", padding=10)
         class_frame.pack(fill=tk.X, padx=10, pady=10)
         
-        class_label = ttk.Label(class_frame, text="Đang khởi tạo...")
-        class_label.pack(pady=5)
-        
-        student_label = ttk.Label(class_frame, text="0/0 học sinh")
-        student_label.pack(pady=5)
-        
-        class_progress = ttk.Progressbar(class_frame, orient=tk.HORIZONTAL, length=350, mode='determinate')
-        class_progress.pack(fill=tk.X, pady=5)
+        class_rows = {}
+        for config in class_configs:
+            row = ttk.Frame(class_frame)
+            row.pack(fill=tk.X, pady=2)
+            class_label = ttk.Label(row, text=f"Lớp {config['tab_id']}: đang chờ...", width=28)
+            class_label.pack(side=tk.LEFT)
+            class_progress = ttk.Progressbar(row, orient=tk.HORIZONTAL, length=150, mode='determinate')
+            class_progress['maximum'] = len(config['student_ids'])
+            class_progress.pack(side=tk.RIGHT, fill=tk.X, expand=True)
+            class_rows[config['tab_id']] = (class_label, class_progress)
         
         # Processing info
         log_frame = ttk.LabelFrame(progress_window, text="Thông tin xử lý", padding=10)
@@ -867,106 +3518,199 @@ GitHub: https://github.com/MRXz194
             log_text.see(tk.END)
             log_text.config(state=tk.DISABLED)
             
-        # Process classes one by one to improve UI responsiveness
         total_classes = len(class_configs)
-        overall_progress['maximum'] = total_classes
+        total_students = sum(len(config['student_ids']) for config in class_configs)
+        overall_progress['maximum'] = total_students
         
-        def process_class_by_index(idx):
-            if idx >= len(class_configs):
-                # All classes have been processed
-                add_log("Hoàn thành tất cả lớp!")
-                overall_label.config(text=f"{total_classes}/{total_classes} lớp hoàn thành")
-                
-                # Update report
-                self.update_report(all_failed_students)
-                if all_failed_students:
-                    self.notebook.select(self.report_frame)
-                    
-                # Close progress window after 2 seconds
-                progress_window.after(2000, progress_window.destroy)
-                return
-                
-            config = class_configs[idx]
-            add_log(f"Bắt đầu xử lý Lớp {config['tab_id']}")
-            class_label.config(text=f"Lớp {config['tab_id']}")
-            
+        try:
+            max_concurrent = max(1, int(self.max_concurrent_var.get()))
+        except (tk.TclError, ValueError):
+            max_concurrent = DEFAULT_MAX_CONCURRENT_CLASSES
+        
+        # Run workers on a background executor so Selenium waits never block the Tk mainloop.
+        # Each class drives its own browser, so up to max_concurrent classes run at the same time.
+        runner, control = self.create_runner(max_concurrent)
+        in_process = isinstance(runner, ProcessJobRunner)
+        self.add_job_controls(progress_window, control, add_log)
+        add_log(f"Chạy {min(max_concurrent, total_classes)} lớp song song"
+                + (" trong tiến trình riêng" if in_process else ""))
+        configs_by_tab = {}
+        for config in class_configs:
+            if config['resumed']:
+                add_log(f"Lớp {config['tab_id']}: bỏ qua {config['resumed']} học sinh đã điểm danh")
             worker = ClassAttendanceWorker(
                 config['student_ids'],
                 config['online_students'],
-                config['lesson_type']
+                config['lesson_type'],
+                class_name=config['class_name'],
+                control=control,
+                **self.worker_options(config['tab_id'])
             )
             
             # Set existing browser if available
-            if config['browser']:
+            if in_process:
+                worker.class_url = self.release_tab_browser(config['tab_id'])
+            elif config['browser']:
                 worker.driver = config['browser']
-                worker.wait = WebDriverWait(config['browser'], 20)
+                worker.wait = WebDriverWait(config['browser'], worker.timeouts['element'])
+            
+            configs_by_tab[config['tab_id']] = config
+            self.running_tabs.add(config['tab_id'])
+            runner.submit(worker, config['tab_id'])
+        
+        finished_classes = []
+        skipped_counts = []
+        cancelled_counts = []
+        students_done = {}
+        run_timings = TimingRecorder()
+        run = self.failures.start_run()
+        
+        def update_overall():
+            done = sum(students_done.values())
+            overall_progress['value'] = done
+            overall_label.config(text=f"{len(finished_classes)}/{total_classes} lớp hoàn thành - {done}/{total_students} học sinh")
+        
+        def set_status(config, text):
+            try:
+                config['status_label'].config(text=text)
+            except tk.TclError:
+                # The class tab was deleted during the run
+                pass
+        
+        def record_event(event):
+            """Bookkeeping and the class tab's status, done whether or not the progress window is open"""
+            config = configs_by_tab[event['tab_id']]
+            # Failures reach the report table as they arrive
+            if event.get('failed'):
+                self.failures.add(run, config['class_name'], event['failed'])
             
-            total_students = len(config['student_ids'])
-            class_progress['maximum'] = total_students
+            if event['type'] in ('done', 'cancelled', 'error'):
+                self.running_tabs.discard(config['tab_id'])
             
-            # Create generator for class processing
-            process_generator = worker.process_class()
+            if event['type'] == 'progress':
+                students_done[config['tab_id']] = event['current']
+                
+            elif event['type'] == 'done':
+                failed_students = event['failed_students']
+                finished_classes.append(config['tab_id'])
+                skipped_counts.append(event['skipped'])
+                all_failed_students.extend((student_id, error, config['tab_id']) for student_id, error in failed_students)
+                run_timings.merge(event['timings'])
+                if event['cancelled']:
+                    cancelled_counts.append(event['remaining'])
+                    set_status(config, f"Đã dừng, còn {event['remaining']} học sinh chưa điểm danh.")
+                elif failed_students:
+                    set_status(config, f"Hoàn thành! Có {len(failed_students)} học sinh bị lỗi.")
+                else:
+                    skipped_note = f" (bỏ qua {event['skipped']} học sinh đã đúng)" if event['skipped'] else ""
+                    set_status(config, f"Hoàn thành điểm danh!{skipped_note}")
+                
+            elif event['type'] == 'cancelled':
+                # Stopped before the class got a browser
+                finished_classes.append(config['tab_id'])
+                cancelled_counts.append(event['remaining'])
+                set_status(config, "Đã dừng trước khi bắt đầu.")
+                
+            elif event['type'] == 'error':
+                finished_classes.append(config['tab_id'])
+                all_failed_students.append((None, event['error'], config['tab_id']))
+                self.failures.add(run, config['class_name'], [(None, event['error'])])
+                run_timings.merge(event['timings'])
+                set_status(config, "Lỗi rùi huhu")
+        
+        def show_event(event):
+            """Progress window updates, these fail once the window has been closed"""
+            config = configs_by_tab[event['tab_id']]
+            class_label, class_progress = class_rows[config['tab_id']]
             
-            def process_next_student():
-                try:
-                    # Get next progress update
-                    current, total = next(process_generator)
-                    
-                    # Update progress
-                    percent = int((current / total) * 100)
-                    student_label.config(text=f"{current}/{total} học sinh ({percent}%)")
-                    class_progress['value'] = current
-                    
-                    # Add log for every 5th student or last student
-                    if current % 5 == 0 or current == total:
-                        add_log(f"Đã xử lý {current}/{total} học sinh")
-                    
-                    # Process next student
-                    progress_window.after(10, process_next_student)
-                    
-                except StopIteration as result:
-                    # Processing is complete for current class
-                    failed_students = worker.failed_students
-                    
-                    if failed_students:
-                        # Add class information to each failed student
-                        class_failed_students = [(student_id, error, config['tab_id']) for student_id, error in failed_students]
-                        all_failed_students.extend(class_failed_students)
-                        config['status_label'].config(text=f"Hoàn thành! Có {len(failed_students)} học sinh bị lỗi.")
-                        add_log(f"Lớp {config['tab_id']} hoàn thành với {len(failed_students)} lỗi")
-                    else:
-                        config['status_label'].config(text="Hoàn thành điểm danh!")
-                        add_log(f"Lớp {config['tab_id']} hoàn thành không có lỗi")
-                    
-                    # Update overall progress
-                    overall_progress['value'] = idx + 1
-                    overall_label.config(text=f"{idx + 1}/{total_classes} lớp hoàn thành")
-                    
-                    # Process next class
-                    progress_window.after(500, lambda: process_class_by_index(idx + 1))
-                    
-                except Exception as e:
-                    logging.error(f"Error in worker thread: {str(e)}")
-                    config['status_label'].config(text="Lỗi rùi huhu")
-                    all_failed_students.append((None, str(e), config['tab_id']))
-                    add_log(f"Lỗi xử lý Lớp {config['tab_id']}: {str(e)}")
+            if event['type'] == 'start':
+                if config.get('started'):
+                    add_log(f"Lớp {config['tab_id']}: tiến trình bị dừng đột ngột, chạy lại phần còn lại")
+                config['started'] = True
+                add_log(f"Bắt đầu xử lý Lớp {config['tab_id']}")
+                class_label.config(text=f"Lớp {config['tab_id']}: 0/{event['total']} học sinh")
+                class_progress['maximum'] = event['total']
+                class_progress['value'] = 0
+                
+            elif event['type'] == 'progress':
+                current, total = event['current'], event['total']
+                percent = int((current / total) * 100)
+                class_label.config(text=f"Lớp {config['tab_id']}: {current}/{total} học sinh ({percent}%)")
+                class_progress['value'] = current
+                update_overall()
+                
+                # Add log for every 5th student or last student
+                if current % 5 == 0 or current == total:
+                    add_log(f"Lớp {config['tab_id']}: đã xử lý {current}/{total} học sinh")
                     
-                    # Process next class
-                    progress_window.after(500, lambda: process_class_by_index(idx + 1))
+            elif event['type'] == 'done':
+                failed_students = event['failed_students']
+                if event['cancelled']:
+                    class_label.config(text=f"Lớp {config['tab_id']}: đã dừng ({event['remaining']} còn lại)")
+                else:
+                    class_label.config(text=f"Lớp {config['tab_id']}: xong ({len(failed_students)} lỗi)")
+                update_overall()
+                
+                if event['skipped']:
+                    add_log(f"Lớp {config['tab_id']}: {event['skipped']} học sinh đã đúng, bỏ qua")
+                if event['recovered']:
+                    add_log(f"Lớp {config['tab_id']}: thử lại thành công {event['recovered']} học sinh")
+                if event['cancelled']:
+                    add_log(f"Lớp {config['tab_id']} đã dừng, còn {event['remaining']} học sinh")
+                elif failed_students:
+                    add_log(f"Lớp {config['tab_id']} hoàn thành với {len(failed_students)} lỗi")
+                else:
+                    add_log(f"Lớp {config['tab_id']} hoàn thành không có lỗi")
+                
+            elif event['type'] == 'cancelled':
+                class_label.config(text=f"Lớp {config['tab_id']}: đã dừng")
+                update_overall()
+                add_log(f"Lớp {config['tab_id']}: đã dừng trước khi bắt đầu")
+                
+            elif event['type'] == 'error':
+                class_label.config(text=f"Lớp {config['tab_id']}: xong (1 lỗi)")
+                update_overall()
+                add_log(f"Lỗi xử lý Lớp {config['tab_id']}: {event['error']}")
+        
+        def poll_events():
+            for event in runner.drain():
+                record_event(event)
+                try:
+                    show_event(event)
+                except tk.TclError:
+                    # The progress window was closed while workers keep running
+                    pass
+            
+            if len(finished_classes) < total_classes:
+                self.root.after(100, poll_events)
+                return
+            
+            # All classes have been processed
+            runner.shutdown()
+            if progress_window.winfo_exists():
+                add_log("Hoàn thành tất cả lớp!")
+                # Close progress window after 2 seconds
+                progress_window.after(2000, progress_window.destroy)
             
-            # Start processing the current class
-            progress_window.after(10, process_next_student)
+            # Update report
+            self.last_timings = run_timings
+            self.update_report(all_failed_students, skipped_count=sum(skipped_counts), timings=run_timings,
+                               cancelled_count=sum(cancelled_counts), run=run)
+            if all_failed_students:
+                self.notebook.select(self.report_frame)
         
-        # Start processing with the first class
-        progress_window.after(100, lambda: process_class_by_index(0))
+        # Start draining worker events
+        self.root.after(100, poll_events)
 
     def process_single_class(self, tab_id):
         tab = next((tab for tab in self.class_tabs if tab['id'] == tab_id), None)
         if not tab:
             return
+        if tab_id in self.running_tabs:
+            messagebox.showwarning("Cảnh báo", "Lớp này đang được điểm danh, hãy đợi chạy xong!")
+            return
 
-        student_ids = tab['student_ids_entry'].get().strip()
-        is_valid, result = self.validate_class_input(student_ids)
+        is_valid, result = validate_student_list(tab['roster'].ids)
         if not is_valid:
             messagebox.showerror("Lỗi", result)
             return
@@ -974,30 +3718,38 @@ GitHub: https://github.com/MRXz194
         online_ids = tab['online_ids_entry'].get().strip()
         online_students = set(id.strip() for id in online_ids.split(',') if id.strip())
 
+        if not self.require_class_urls([tab_id]):
+            return
+
         # Create worker and set its browser if we have one
+        runner, control = self.create_runner(1)
+        in_process = isinstance(runner, ProcessJobRunner)
         worker = ClassAttendanceWorker(
             result,
             online_students,
-            tab['lesson_type'].get()
+            tab['lesson_type'].get(),
+            class_name=self.tab_name(tab),
+            control=control,
+            **self.worker_options(tab_id)
         )
 
         # Use existing browser if available
-        if tab_id in self.tab_browsers:
-            try:
-                driver = self.tab_browsers[tab_id]
-                # Check if browser is still responsive
-                driver.current_url
+        if in_process:
+            worker.class_url = self.release_tab_browser(tab_id)
+        elif tab_id in self.tab_browsers:
+            driver = self.tab_browsers[tab_id]
+            if is_browser_alive(driver):
                 # Set the existing browser
                 worker.driver = driver
-                worker.wait = WebDriverWait(driver, 20)
-            except:
+                worker.wait = WebDriverWait(driver, worker.timeouts['element'])
+            else:
                 # Browser was closed by user
                 self.tab_browsers.pop(tab_id)
 
         # Create progress window
         progress_window = tk.Toplevel(self.root)
         progress_window.title(f"Tiến trình điểm danh - Lớp {tab_id}")
-        progress_window.geometry("400x250")
+        progress_window.geometry("400x290")
         progress_window.transient(self.root)
         progress_window.resizable(False, False)
         
@@ -1030,19 +3782,30 @@ GitHub: https://github.com/MRXz194
             log_text.see(tk.END)
             log_text.config(state=tk.DISABLED)
             
-        # Create generator for processing
-        add_log(f"Bắt đầu xử lý Lớp {tab_id}")
-        process_generator = worker.process_class()
-        
         total_students = len(result)
         progress_bar['maximum'] = total_students
         
-        def process_next_student():
-            try:
-                # Get next progress update
-                current, total = next(process_generator)
+        # Run the worker in the background and drain its progress events on a timer
+        self.add_job_controls(progress_window, control, add_log)
+        self.running_tabs.add(tab_id)
+        runner.submit(worker, tab_id)
+        
+        started = []
+        run = self.failures.start_run()
+        class_name = self.tab_name(tab)
+        
+        def handle_event(event):
+            if event.get('failed'):
+                self.failures.add(run, class_name, event['failed'])
+            
+            if event['type'] == 'start':
+                if started:
+                    add_log("Tiến trình bị dừng đột ngột, chạy lại phần còn lại")
+                started.append(event['total'])
+                add_log(f"Bắt đầu xử lý Lớp {tab_id}")
                 
-                # Update progress
+            elif event['type'] == 'progress':
+                current, total = event['current'], event['total']
                 percent = int((current / total) * 100)
                 student_label.config(text=f"{current}/{total} học sinh ({percent}%)")
                 progress_bar['value'] = current
@@ -1050,92 +3813,151 @@ GitHub: https://github.com/MRXz194
                 # Add log for every 5th student or last student
                 if current % 5 == 0 or current == total:
                     add_log(f"Đã xử lý {current}/{total} học sinh")
+                    
+            elif event['type'] == 'done':
+                # Report and tab status first, add_log fails once the progress window is closed
+                failed_students = event['failed_students']
                 
-                # Process next student
-                progress_window.after(10, process_next_student)
-                
-            except StopIteration:
-                # Processing is complete
-                failed_students = worker.failed_students
+                # Add class information to each failed student
+                class_failed_students = [(student_id, error, tab_id) for student_id, error in failed_students]
+                self.last_timings = event['timings']
+                self.update_report(class_failed_students, skipped_count=event['skipped'], timings=event['timings'],
+                                   cancelled_count=event['remaining'] if event['cancelled'] else 0, run=run)
                 
-                if failed_students:
-                    # Add class information to each failed student
-                    class_failed_students = [(student_id, error, tab_id) for student_id, error in failed_students]
+                if event['cancelled']:
+                    tab['status_label'].config(text=f"Đã dừng, còn {event['remaining']} học sinh chưa điểm danh.")
+                    add_log(f"Đã dừng, còn {event['remaining']} học sinh")
+                elif failed_students:
                     tab['status_label'].config(text=f"Hoàn thành! Có {len(failed_students)} học sinh bị lỗi.")
-                    add_log(f"Hoàn thành với {len(failed_students)} lỗi")
-                    self.update_report(class_failed_students)
                     self.notebook.select(self.report_frame)
+                    add_log(f"Hoàn thành với {len(failed_students)} lỗi")
                 else:
-                    tab['status_label'].config(text="Hoàn thành điểm danh!")
+                    skipped_note = f" (bỏ qua {event['skipped']} học sinh đã đúng)" if event['skipped'] else ""
+                    tab['status_label'].config(text=f"Hoàn thành điểm danh!{skipped_note}")
                     add_log("Hoàn thành không có lỗi")
+                if event['skipped']:
+                    add_log(f"{event['skipped']} học sinh đã đúng, bỏ qua")
+                if event['recovered']:
+                    add_log(f"Thử lại thành công {event['recovered']} học sinh")
                 
-                # Close progress window after 2 seconds
-                progress_window.after(2000, progress_window.destroy)
+            elif event['type'] == 'cancelled':
+                tab['status_label'].config(text="Đã dừng trước khi bắt đầu.")
+                add_log("Đã dừng trước khi bắt đầu")
                 
-            except Exception as e:
-                logging.error(f"Error processing class: {str(e)}")
+            elif event['type'] == 'error':
+                self.failures.add(run, class_name, [(None, event['error'])])
                 tab['status_label'].config(text="Lỗi rùi huhu")
-                self.update_report([(None, str(e), tab_id)])
+                self.last_timings = event['timings']
+                self.update_report([(None, event['error'], tab_id)], timings=event['timings'], run=run)
                 self.notebook.select(self.report_frame)
-                add_log(f"Lỗi: {str(e)}")
+                add_log(f"Lỗi: {event['error']}")
+        
+        def poll_events():
+            finished = False
+            for event in runner.drain():
+                finished = finished or event['type'] in ('done', 'error', 'cancelled')
+                if finished:
+                    self.running_tabs.discard(tab_id)
+                try:
+                    handle_event(event)
+                except tk.TclError:
+                    # The progress window was closed while the worker keeps running
+                    pass
+            
+            if not finished:
+                self.root.after(100, poll_events)
+                return
+            
+            runner.shutdown()
+            if progress_window.winfo_exists():
+                # Close progress window after 2 seconds
                 progress_window.after(2000, progress_window.destroy)
         
-        # Start processing
-        progress_window.after(100, process_next_student)
+        # Start draining worker events
+        self.root.after(100, poll_events)
 
     def open_browser_for_tab(self, tab_id):
         if tab_id in self.tab_browsers:
-            try:
-                # Check if browser is still responsive
-                self.tab_browsers[tab_id].current_url
+            if is_browser_alive(self.tab_browsers[tab_id]):
                 messagebox.showinfo("Thông báo", "Trình duyệt đã được mở cho lớp này rồi!")
                 return
-            except:
-                # Browser was closed, remove it from our tracking
-                self.tab_browsers.pop(tab_id)
+            # Browser was closed, remove it from our tracking
+            self.tab_browsers.pop(tab_id)
 
         def open_browser_thread():
             try:
-                chrome_options = Options()
-                chrome_options.add_argument('--start-maximized')
-                chrome_options.add_argument('--log-level=3')
-                driver = webdriver.Chrome(options=chrome_options)
+                # Always visible: the user logs in and opens the class page here, the run
+                # profile only applies to browsers the tool drives on its own
+                driver = start_browser('default', profile_dir(f"tab_{tab_id}"))
                 self.tab_browsers[tab_id] = driver
-                driver.get('http://quanly.bgo.edu.vn/')
-                driver.execute_script("document.body.style.zoom='67%'")
                 logging.info(f"Browser opened for class tab {tab_id}")
             except Exception as e:
                 self.root.after(0, lambda: messagebox.showerror("Lỗi", f"Không thể mở trình duyệt: {str(e)}"))
 
         threading.Thread(target=open_browser_thread, daemon=True).start()
 
-    def update_report(self, failed_students=None):
+    def export_timings(self):
+        if not self.last_timings or not self.last_timings.samples:
+            messagebox.showinfo("Thông báo", "Chưa có dữ liệu thời gian. Hãy chạy điểm danh trước!")
+            return
+        
+        path = filedialog.asksaveasfilename(
+            title="Xuất thời gian xử lý",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON", "*.json")]
+        )
+        if not path:
+            return
+        try:
+            if path.lower().endswith('.json'):
+                self.last_timings.export_json(path)
+            else:
+                self.last_timings.export_csv(path)
+            messagebox.showinfo("Thông báo", f"Đã xuất thời gian xử lý ra {path}")
+        except OSError as e:
+            messagebox.showerror("Lỗi", f"Không thể ghi file: {str(e)}")
+
+    def timing_report_lines(self, timings):
+        """Text summary of phase timings for the report tab, in milliseconds"""
+        lines = ["=== Thời gian xử lý (ms) ===", f"{'Bước':<22}{'SL':>6}{'p50':>9}{'p95':>9}{'max':>9}"]
+        for row in timings.summary():
+            lines.append(
+                f"{row['phase']:<22}{row['count']:>6}{row['p50'] * 1000:>9.0f}{row['p95'] * 1000:>9.0f}{row['max'] * 1000:>9.0f}"
+            )
+        
+        # Per-class time per student
+        class_rows = [row for row in timings.summary(by_class=True) if row['phase'] == 'student']
+        if class_rows:
+            lines.append("")
+            for row in class_rows:
+                lines.append(
+                    f"{row['class']}: {row['count']} học sinh, p50 {row['p50'] * 1000:.0f} ms, "
+                    f"p95 {row['p95'] * 1000:.0f} ms, tổng {row['total']:.1f} s"
+                )
+        return lines
+
+    def update_report(self, failed_students=None, skipped_count=0, timings=None, cancelled_count=0, run=None):
+        """Summary of the last run above the table, the failures themselves are already in it"""
         self.report_text.config(state=tk.NORMAL)
         self.report_text.delete(1.0, tk.END)
         
-        if not failed_students:
-            self.report_text.insert(tk.END, "Không có học sinh nào bị lỗi trong lần chạy gần nhất.")
+        failed_students = failed_students or []
+        classes = len({class_id for _, _, class_id in failed_students})
+        title = f"Lần chạy #{run}: " if run else ""
+        if failed_students:
+            self.report_text.insert(tk.END, f"{title}{len(failed_students)} lỗi ở {classes} lớp.\n")
         else:
-            self.report_text.insert(tk.END, "Danh sách học sinh bị lỗi:\n\n")
-            # Group errors by class
-            errors_by_class = {}
-            for student_id, error, class_id in failed_students:
-                if class_id not in errors_by_class:
-                    errors_by_class[class_id] = []
-                errors_by_class[class_id].append((student_id, error))
-            
-            # Display errors grouped by class
-            for class_id in sorted(errors_by_class.keys()):
-                self.report_text.insert(tk.END, f"=== Lớp {class_id} ===\n\n")
-                for student_id, error in errors_by_class[class_id]:
-                    if student_id:  # Skip browser initialization errors
-                        self.report_text.insert(tk.END, f"Mã học sinh: {student_id}\n")
-                        self.report_text.insert(tk.END, f"Lỗi: {error}\n")
-                        self.report_text.insert(tk.END, "-" * 50 + "\n")
-                    else:
-                        self.report_text.insert(tk.END, f"Lỗi khởi tạo: {error}\n")
-                        self.report_text.insert(tk.END, "-" * 50 + "\n")
-                self.report_text.insert(tk.END, "\n")
+            self.report_text.insert(tk.END, f"{title}Không có học sinh nào bị lỗi.\n")
+        
+        if cancelled_count:
+            self.report_text.insert(tk.END, f"Đã dừng giữa chừng: {cancelled_count} học sinh chưa được điểm danh "
+                                            f"(bấm \"Tiếp tục điểm danh\" để chạy tiếp).\n")
+        
+        if skipped_count:
+            self.report_text.insert(tk.END, f"Bỏ qua {skipped_count} học sinh đã điểm danh đúng từ trước.\n")
+        
+        if timings and timings.samples:
+            self.report_text.insert(tk.END, "\n" + "\n".join(self.timing_report_lines(timings)) + "\n")
         
         self.report_text.config(state=tk.DISABLED)
 
@@ -1146,6 +3968,8 @@ GitHub: https://github.com/MRXz194
                 driver.quit()
             except:
                 pass
+        self.driver_pool.shutdown()
+        self.save_profiles()
         logging.info("Shutting down application")
         self.root.destroy()
 
@@ -1226,6 +4050,202 @@ GitHub: https://github.com/MRXz194
         # Wait for the dialog to close
         self.root.wait_window(dialog)
 
+def run_cli(argv=None):
+    """Run attendance for the classes in a definition file without the GUI.
+
+    Returns the process exit code: 0 when every student was marked, 1 when some
+    failed, 2 when the class file is invalid, 130 when stopped by SIGINT/SIGTERM.
+    """
+    parser = argparse.ArgumentParser(
+        prog='bgo_auto_tool.py',
+        description="Điểm danh không cần giao diện từ file cấu hình lớp (JSON, YAML hoặc CSV)"
+    )
+    parser.add_argument('classes', help="file cấu hình lớp")
+    parser.add_argument('-j', '--concurrency', type=int, default=DEFAULT_MAX_CONCURRENT_CLASSES,
+                        help="số lớp chạy song song")
+    parser.add_argument('--engine', choices=engine_choices(), default=DEFAULT_ENGINE,
+                        help="'api' chỉ dùng được khi đã điền API_CONFIG")
+    parser.add_argument('--profile', choices=list(BROWSER_PROFILES), default='lean',
+                        help="cấu hình trình duyệt, mặc định chạy ẩn")
+    parser.add_argument('--backend', choices=list(JOB_BACKENDS), default=DEFAULT_JOB_BACKEND,
+                        help="chạy mỗi lớp trong luồng hoặc trong tiến trình riêng")
+    parser.add_argument('--skip-correct', action='store_true', help="bỏ qua ô đã đúng")
+    parser.add_argument('--attempts', type=int, default=DEFAULT_RETRY_ATTEMPTS,
+                        help="số lần thử mỗi học sinh trước khi báo lỗi")
+    parser.add_argument('--shards', type=int, default=DEFAULT_SHARDS,
+                        help=f"số trình duyệt chia nhau một lớp lớn (tối đa {MAX_SHARDS})")
+    parser.add_argument('--resume', action='store_true', help="bỏ qua học sinh đã điểm danh hôm nay")
+    parser.add_argument('--report', default='-', help="file báo cáo JSON, '-' để in ra stdout")
+    args = parser.parse_args(argv)
+    
+    try:
+        definitions = load_class_definitions(args.classes)
+    except (OSError, ValueError) as e:
+        logging.error(f"Invalid class file {args.classes}: {str(e)}")
+        return 2
+    
+    journal = AttendanceJournal()
+    latency = AdaptiveTimeouts()
+    results = []
+    for definition in definitions:
+        student_ids = definition['student_ids']
+        if args.resume:
+            student_ids = journal.remaining(definition['name'], definition['lesson_type'], student_ids)
+        results.append({
+            'class': definition['name'],
+            'lesson_type': definition['lesson_type'],
+            'total': len(definition['student_ids']),
+            'resumed': len(definition['student_ids']) - len(student_ids),
+            'processed': 0,
+            'skipped': 0,
+            'recovered': 0,
+            'save_statuses': {},
+            'failed': [],
+            'remaining': 0,
+            'status': 'pending',
+            'error': None,
+            'student_ids': student_ids,
+        })
+    pending = [index for index, result in enumerate(results) if result['student_ids']]
+    
+    started_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+    timings = TimingRecorder()
+    concurrency = max(1, min(args.concurrency, len(pending) or 1))
+    # Pooled browsers reuse the pool_<n> profiles, so a login made in the GUI carries over.
+    # Worker processes keep their own browser on the same profiles instead of a shared pool.
+    if args.backend == 'process':
+        driver_pool = None
+        control = JobControl(process_context())
+        runner = ProcessJobRunner(max_workers=concurrency, control=control)
+    else:
+        driver_pool = DriverPool(concurrency, profile=args.profile)
+        control = JobControl()
+        runner = AttendanceJobRunner(max_workers=concurrency, control=control)
+    
+    # Ctrl+C or a service stop finishes the current student, then reports what is left
+    def stop(signum, frame):
+        logging.warning(f"Received signal {signum}, stopping after the current student")
+        control.cancel()
+    previous_handlers = {signum: signal.signal(signum, stop) for signum in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        if pending and driver_pool:
+            # Import first, the pool threads launch Chrome straight away
+            load_selenium()
+            driver_pool.start()
+        for index in pending:
+            definition = definitions[index]
+            # Without a pooled browser the class opens its own saved profile, so a login there is kept
+            user_data_dir = None
+            if driver_pool:
+                user_data_dir = profile_dir("cli_" + re.sub(r'[^\w-]+', '_', definition['name']))
+            worker = ClassAttendanceWorker(
+                results[index]['student_ids'],
+                definition['online_students'],
+                definition['lesson_type'],
+                engine=args.engine,
+                browser_profile=args.profile,
+                user_data_dir=user_data_dir,
+                driver_pool=driver_pool,
+                journal=journal,
+                class_name=definition['name'],
+                skip_correct=args.skip_correct,
+                class_url=definition['url'],
+                retry_attempts=max(1, args.attempts),
+                latency=latency,
+                control=control,
+                shards=min(MAX_SHARDS, max(1, args.shards)),
+            )
+            runner.submit(worker, index)
+        
+        remaining = len(pending)
+        while remaining:
+            try:
+                # Wake up regularly so signal handlers get to run
+                event = runner.events.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            result = results[event['tab_id']]
+            if event['type'] == 'start':
+                result['status'] = 'running'
+                logging.info(f"[{result['class']}] started, {event['total']} students")
+            elif event['type'] == 'progress':
+                result['processed'] = event['current']
+            elif event['type'] == 'done':
+                # Entries without a student ID are class errors, e.g. a browser that never started
+                class_errors = [error for student_id, error in event['failed_students'] if student_id is None]
+                if event['cancelled']:
+                    result['status'] = 'cancelled'
+                else:
+                    result['status'] = 'error' if class_errors else 'done'
+                result['error'] = class_errors[0] if class_errors else None
+                result['remaining'] = event['remaining']
+                result['skipped'] = event['skipped']
+                result['recovered'] = event['recovered']
+                result['save_statuses'] = event['save_statuses']
+                result['failed'] = [
+                    {'student_id': student_id, 'error': error}
+                    for student_id, error in event['failed_students'] if student_id is not None
+                ]
+                timings.merge(event['timings'])
+                remaining -= 1
+                logging.info(f"[{result['class']}] {result['status']}, {len(result['failed'])} failed")
+            elif event['type'] == 'cancelled':
+                result['status'] = 'cancelled'
+                result['remaining'] = event['remaining']
+                remaining -= 1
+            elif event['type'] == 'error':
+                result['status'] = 'error'
+                result['error'] = event['error']
+                result['remaining'] = result['total'] - result['resumed'] - result['processed']
+                timings.merge(event['timings'])
+                remaining -= 1
+    finally:
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+        runner.shutdown()
+        if driver_pool:
+            driver_pool.shutdown()
+    
+    for result in results:
+        del result['student_ids']
+        if result['status'] == 'pending':
+            result['status'] = 'already_done'
+    report = {
+        'started_at': started_at,
+        'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'engine': args.engine,
+        'backend': args.backend,
+        'classes': results,
+        'summary': {
+            'classes': len(results),
+            'students': sum(result['total'] for result in results),
+            'resumed': sum(result['resumed'] for result in results),
+            'skipped': sum(result['skipped'] for result in results),
+            'recovered': sum(result['recovered'] for result in results),
+            'failed': sum(len(result['failed']) for result in results),
+            'class_errors': sum(result['status'] == 'error' for result in results),
+            'remaining': sum(result['remaining'] for result in results),
+        },
+        'cancelled': control.cancelled,
+        'timings': timings.summary(by_class=True),
+    }
+    if args.report == '-':
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write('\n')
+    else:
+        with open(args.report, 'w', encoding='utf-8') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+    
+    if control.cancelled:
+        return 130
+    return 1 if report['summary']['failed'] or report['summary']['class_errors'] else 0
+
 if __name__ == "__main__":
+    import multiprocessing
+    # Worker processes of a frozen (PyInstaller) build start through this entry point
+    multiprocessing.freeze_support()
+    # With a class file argument run headless, otherwise open the GUI
+    if len(sys.argv) > 1:
+        sys.exit(run_cli())
     app = StudentAttendanceChecker()
     app.run()
\ No newline at end of file